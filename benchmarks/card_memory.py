@@ -0,0 +1,91 @@
+"""
+Measure the memory retained per card when loading the due words of several sets.
+
+Run from the root of the repository:
+
+    python benchmarks/card_memory.py [--sets 5] [--words 20000]
+
+Run it on an older checkout to compare representations of loaded cards.
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+#  pylint: disable=wrong-import-position
+from language_practice.config import Config, Entry
+from language_practice.repetition import WordRepetition
+from language_practice.sqlite import SqliteHandle
+
+
+def build(db: str, sets: int, words: int):
+    """
+    Fill a database with sets of words that are all due today.
+    """
+    rng = random.Random(1)
+    today = date.today()
+    handle = SqliteHandle(db)
+    for set_number in range(sets):
+        entries = [
+            Entry(
+                f"word{set_number}_{i}",
+                f"definition {i}",
+                rng.choice(["m", "f", "n", None]),
+                rng.choice(["pf", "impf", None]),
+                f"usage {i}",
+                rng.choice(["noun", "verb", "adjective"]),
+                None,
+                WordRepetition(
+                    2.5,
+                    0,
+                    0,
+                    today - timedelta(days=rng.randrange(30)),
+                    rng.random() < 0.2,
+                ),
+            )
+            for i in range(words)
+        ]
+        handle.import_set(f"set{set_number}", Config("ru", entries), {})
+    handle.close()
+
+
+def main():
+    """
+    Main function
+    """
+    parse = argparse.ArgumentParser(description="Memory retained per loaded card")
+    parse.add_argument("--sets", type=int, default=5)
+    parse.add_argument("--words", type=int, default=20000)
+    args = parse.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = os.path.join(directory, "benchmark.sqlite")
+        build(db, args.sets, args.words)
+        handle = SqliteHandle(db)
+        # Warm up statement and string caches so they are not counted.
+        handle.load_config("set0")
+        gc.collect()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        configs = [handle.load_config(f"set{i}") for i in range(args.sets)]
+        elapsed = time.perf_counter() - start
+        (retained, _) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        cards = sum(len(config) for config in configs)
+        print(f"{cards} cards, {retained / cards:.0f} bytes per card")
+        print(f"loaded in {elapsed:.2f}s with tracing enabled")
+        handle.close()
+
+
+if __name__ == "__main__":
+    main()
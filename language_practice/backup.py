@@ -0,0 +1,265 @@
+"""
+Online backups of the study database.
+"""
+
+import math
+import os
+import re
+import sqlite3
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from threading import Event, Thread
+from typing import Callable
+
+from language_practice.worker import DatabaseWorker
+
+# Pages copied in each step of a backup. Locks on the database are only held for the
+# duration of a step so grading and imports can run in between.
+DEFAULT_PAGES = 256
+# Seconds to wait before retrying a step of a backup while the database is locked.
+DEFAULT_SLEEP = 0.005
+# Times a backup may start over because the database was written to before the rest
+# is copied in a single step.
+DEFAULT_RESTARTS = 3
+# Hours between scheduled snapshots.
+DEFAULT_INTERVAL = 24.0
+# Number of scheduled snapshots kept before the oldest is removed.
+DEFAULT_KEEP = 7
+
+SNAPSHOT_SUFFIX = ".sqlite"
+SNAPSHOT_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def default_backup_dir() -> str:
+    """
+    Get the default directory for scheduled snapshots following the XDG base
+    directory specification.
+    """
+    data_home = os.environ.get(
+        "XDG_DATA_HOME", os.path.join(os.path.expanduser("~"), ".local", "share")
+    )
+    return os.path.join(data_home, "language-practice", "backups")
+
+
+def connect_read_only(path: str) -> sqlite3.Connection:
+    """
+    Open a database that must already exist without allowing writes to it.
+    """
+    return sqlite3.connect(f"{Path(os.path.abspath(path)).as_uri()}?mode=ro", uri=True)
+
+
+class BackupRestarted(Exception):
+    """
+    Raised when a backup has started over more times than allowed.
+    """
+
+
+#  pylint: disable=too-few-public-methods
+class RestartLimit:
+    """
+    Progress callback of a backup that stops it once it has started over too many
+    times.
+    """
+
+    def __init__(
+        self, restarts: int, progress: Callable[[int, int, int], object] | None
+    ):
+        self.restarts = restarts
+        self.progress = progress
+        self.remaining: int | None = None
+
+    def __call__(self, status: int, remaining: int, total: int):
+        if self.progress is not None:
+            self.progress(status, remaining, total)
+        # SQLite starts over from the first page when the source is written to, so
+        # more pages are left than after the previous step.
+        if self.remaining is not None and remaining > self.remaining:
+            self.restarts -= 1
+            if self.restarts < 0:
+                raise BackupRestarted()
+        self.remaining = remaining
+
+
+#  pylint: disable=too-many-arguments
+#  pylint: disable=too-many-positional-arguments
+def copy_database(
+    source: str,
+    target: str,
+    pages: int = DEFAULT_PAGES,
+    sleep: float = DEFAULT_SLEEP,
+    progress: Callable[[int, int, int], object] | None = None,
+    restarts: int = DEFAULT_RESTARTS,
+):
+    """
+    Copy a database that may be in use into a new file with the online backup API.
+
+    The copy is written to a temporary file next to the target and only moved into
+    place once it is complete so an interrupted backup never leaves a truncated
+    snapshot behind. If the database keeps being written to, for example during an
+    import, the backup stops starting over after a few attempts and copies the whole
+    database in a single step instead, holding off writers until it is done.
+    """
+    directory = os.path.dirname(os.path.abspath(target))
+    (fd, tmp_path) = tempfile.mkstemp(
+        dir=directory, prefix=".backup-", suffix=SNAPSHOT_SUFFIX
+    )
+    os.close(fd)
+    try:
+        # A connection of its own keeps the copy off the worker thread. The source
+        # connection is opened read only so the backup can never modify the database.
+        src = connect_read_only(source)
+        dst = sqlite3.connect(tmp_path)
+        try:
+            try:
+                src.backup(
+                    dst,
+                    pages=pages,
+                    sleep=sleep,
+                    progress=RestartLimit(restarts, progress),
+                )
+            except BackupRestarted:
+                src.backup(dst, pages=-1, sleep=sleep, progress=progress)
+        finally:
+            dst.close()
+            src.close()
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def snapshot(
+    worker: DatabaseWorker,
+    target: str,
+    pages: int = DEFAULT_PAGES,
+    sleep: float = DEFAULT_SLEEP,
+    progress: Callable[[int, int, int], object] | None = None,
+):
+    """
+    Take a snapshot of a database that is open in a worker.
+
+    SQLite restarts a backup from the first page whenever another connection writes
+    to the database, so grades are held in memory until the copy is done. Grading
+    never waits on the backup and the grades are written as soon as it finishes.
+    """
+    worker.flush_grades().result()
+    worker.pause_grades(True).result()
+    try:
+        copy_database(worker.get_path(), target, pages, sleep, progress)
+    finally:
+        worker.pause_grades(False)
+
+
+def restore(source: str, target: str):
+    """
+    Replace the contents of a database with a snapshot.
+
+    The database must not be open in the application while it is restored.
+    """
+    src = connect_read_only(source)
+    try:
+        try:
+            (result,) = src.execute("PRAGMA quick_check;").fetchone()
+        except sqlite3.DatabaseError as err:
+            raise RuntimeError(f"{source} is not a valid snapshot: {err}") from err
+        if result != "ok":
+            raise RuntimeError(f"{source} is not a valid snapshot: {result}")
+        dst = sqlite3.connect(target)
+        try:
+            # The backup API replaces the target in a single transaction so a failed
+            # restore leaves the database as it was.
+            src.backup(dst)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+
+def snapshot_name(db: str, now: datetime) -> str:
+    """
+    Get the file name of a scheduled snapshot of a database.
+    """
+    stem = os.path.splitext(os.path.basename(db))[0]
+    return f"{stem}-{now.strftime(SNAPSHOT_TIME_FORMAT)}{SNAPSHOT_SUFFIX}"
+
+
+class BackupScheduler:
+    """
+    Takes rotating snapshots of the database open in a worker at a fixed interval
+    from a background thread, keeping only the most recent ones.
+    """
+
+    def __init__(
+        self,
+        worker: DatabaseWorker,
+        directory: str | None = None,
+        interval: float = DEFAULT_INTERVAL,
+        keep: int = DEFAULT_KEEP,
+    ):
+        if not (math.isfinite(interval) and interval > 0):
+            raise RuntimeError(
+                f"Interval between snapshots must be a positive number, not {interval}"
+            )
+        if directory is None:
+            directory = default_backup_dir()
+        os.makedirs(directory, exist_ok=True)
+        self.worker = worker
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.stopped = Event()
+        self.error: Exception | None = None
+
+        self.thread = Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def get_snapshots(self) -> list[str]:
+        """
+        Get paths of the scheduled snapshots of the database, oldest first.
+        """
+        stem = os.path.splitext(os.path.basename(self.worker.get_path()))[0]
+        pattern = re.compile(
+            rf"{re.escape(stem)}-\d{{8}}-\d{{6}}{re.escape(SNAPSHOT_SUFFIX)}"
+        )
+        names = sorted(
+            name for name in os.listdir(self.directory) if pattern.fullmatch(name)
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    def get_error(self) -> Exception | None:
+        """
+        Get the error of the last scheduled snapshot if it failed.
+        """
+        return self.error
+
+    def take_snapshot(self) -> str:
+        """
+        Take a snapshot now and remove the oldest ones beyond the number to keep.
+        """
+        path = os.path.join(
+            self.directory, snapshot_name(self.worker.get_path(), datetime.now())
+        )
+        snapshot(self.worker, path)
+        snapshots = self.get_snapshots()
+        for old in snapshots[: max(len(snapshots) - self.keep, 0)]:
+            os.unlink(old)
+        return path
+
+    def __run(self):
+        """
+        Take snapshots until the scheduler is stopped.
+        """
+        while not self.stopped.wait(self.interval * 60 * 60):
+            try:
+                self.take_snapshot()
+                self.error = None
+            except (OSError, RuntimeError, sqlite3.Error) as err:
+                self.error = err
+
+    def stop(self):
+        """
+        Stop taking snapshots, waiting for a snapshot in progress to finish.
+        """
+        self.stopped.set()
+        self.thread.join()
@@ -2,19 +2,45 @@
 Handles TOML parsing from the configuration file.
 """
 
+import hashlib
+import os
+import re
+from concurrent.futures import Executor
 from datetime import date
-from tomllib import load
-from typing import Any, Self
+from tomllib import TOMLDecodeError, loads
+from typing import Any, Callable, Iterator, Self
 
+from language_practice.config_cache import ConfigCache, Row
 from language_practice.repetition import WordRepetition
 
+# Number of [[words]] tables parsed together in one worker process.
+CHUNK_WORDS = 2000
+
+WORDS_HEADER = re.compile(r"^[ \t]*\[\[[ \t]*words[ \t]*\]\][ \t]*(?:#.*)?$", re.M)
+
 
 #  pylint: disable=too-many-instance-attributes
 class Entry:
     """
     A single entry in the TOML file.
+
+    Charts may be given as a function that loads the charts of a word so they are
+    only read from the database when they are shown. Slots keep the many entries of
+    a loaded set small.
     """
 
+    __slots__ = (
+        "word",
+        "definition",
+        "gender",
+        "aspect",
+        "usage",
+        "part_of_speech",
+        "charts",
+        "repetition",
+        "stale",
+    )
+
     #  pylint: disable=too-many-arguments
     #  pylint: disable=too-many-positional-arguments
     def __init__(
@@ -25,8 +51,9 @@ class Entry:
         aspect: str | None,
         usage: str | None,
         part_of_speech: str | None,
-        charts: list[list[str]] | None,
+        charts: list[list[str]] | Callable[[str], list[list[str]]] | None,
         repetition: WordRepetition,
+        stale: bool = False,
     ):
         self.word = word
         self.definition = definition
@@ -36,6 +63,7 @@ class Entry:
         self.part_of_speech = part_of_speech
         self.charts = charts
         self.repetition = repetition
+        self.stale = stale
 
     def get_word(self) -> str:
         """
@@ -75,8 +103,10 @@ class Entry:
 
     def get_charts(self) -> list[list[str]] | None:
         """
-        Get charts.
+        Get charts, loading them first if they are stored elsewhere.
         """
+        if callable(self.charts):
+            return self.charts(self.word)
         return self.charts
 
     def get_repetition(self) -> WordRepetition:
@@ -85,15 +115,129 @@ class Entry:
         """
         return self.repetition
 
+    def get_stale(self) -> bool:
+        """
+        Get whether the charts for this word should be downloaded again even if they
+        are already stored.
+        """
+        return self.stale
+
+
+def entry_from_dict(dct: dict[str, Any]) -> Entry:
+    """
+    Build a new entry from a table of the TOML file.
+    """
+    return Entry(
+        dct["word"],
+        dct["definition"],
+        dct.get("gender", None),
+        dct.get("aspect", None),
+        dct.get("usage", None),
+        dct.get("part_of_speech", None),
+        dct.get("charts", None),
+        WordRepetition(2.5, 0, 0, date.today(), False),
+        dct.get("stale", False),
+    )
+
+
+def entry_from_row(row: Row, today: date) -> Entry:
+    """
+    Build a new entry from the fields of an entry stored in the parsed file cache.
+    """
+    return Entry(*row[:7], WordRepetition(2.5, 0, 0, today, False), row[7])
+
+
+def entry_to_row(entry: Entry) -> Row:
+    """
+    Get the fields of an entry to store in the parsed file cache.
+    """
+    return (
+        entry.word,
+        entry.definition,
+        entry.gender,
+        entry.aspect,
+        entry.usage,
+        entry.part_of_speech,
+        entry.charts,
+        entry.stale,
+    )
+
+
+def parse_words(text: str) -> list[dict[str, Any]]:
+    """
+    Parse a chunk of [[words]] tables.
+
+    This runs in worker processes so it must stay at module level. Plain tables are
+    returned because they are cheaper to send back than entries.
+    """
+    return loads(text).get("words", [])
+
+
+def split_words(text: str) -> tuple[str, list[str]]:
+    """
+    Split the text of a TOML file into the part before the first [[words]] table and
+    chunks of up to CHUNK_WORDS [[words]] tables each.
+    """
+    starts = [match.start() for match in WORDS_HEADER.finditer(text)]
+    if not starts:
+        return (text, [])
+    bounds = starts[::CHUNK_WORDS] + [len(text)]
+    return (
+        text[: starts[0]],
+        [text[start:end] for (start, end) in zip(bounds, bounds[1:])],
+    )
+
+
+def stream_entries(
+    text: str, pool: Executor | None = None
+) -> tuple[dict[str, Any], Iterator[Entry]]:
+    """
+    Parse the text of a TOML file into its top level keys and a stream of its
+    entries. The file is split at [[words]] boundaries and the chunks are parsed in
+    the pool, if given, and yielded in order as they finish. Even files with a single
+    chunk go to the pool so that several files imported at once are parsed on
+    separate cores.
+    """
+    (header, chunks) = split_words(text)
+    try:
+        toml = loads(header)
+    except TOMLDecodeError:
+        # A line that looks like a [[words]] header inside a multi-line string
+        # splits the file in the wrong place so parse it as a whole instead.
+        (toml, chunks) = (loads(text), [])
+
+    def entries() -> Iterator[Entry]:
+        yield from (entry_from_dict(dct) for dct in toml.get("words", []))
+        if pool is None:
+            parsed: Iterator[list[dict[str, Any]]] = map(parse_words, chunks)
+        else:
+            parsed = pool.map(parse_words, chunks)
+        count = 0
+        try:
+            for chunk in parsed:
+                yield from (entry_from_dict(dct) for dct in chunk)
+                count += len(chunk)
+        except TOMLDecodeError:
+            # The file was split in the wrong place or is invalid. Parsing it as a
+            # whole either gives the remaining entries or reports the error at the
+            # right line.
+            words = loads(text).get("words", [])
+            yield from (entry_from_dict(dct) for dct in words[count:])
+
+    return (toml, entries())
+
 
 class Config:
     """
     Generic config data structure.
     """
 
-    def __init__(self, lang: str | None, entries: list[Entry]):
+    def __init__(
+        self, lang: str | None, entries: list[Entry], file_hash: str | None = None
+    ):
         self.lang = lang
         self.words = entries
+        self.file_hash = file_hash
 
     def __iter__(self):
         return iter(self.words)
@@ -113,6 +257,12 @@ class Config:
         """
         return self.words
 
+    def get_hash(self) -> str | None:
+        """
+        Get the content hash of the file this config was read from, if any.
+        """
+        return self.file_hash
+
     def extend(self, config: Self):
         """
         Extend a TOML config with another TOML config.
@@ -134,20 +284,7 @@ class GraphicalConfig(Config):
 
     def __init__(self, lang: str | None, dcts: list[dict[str, Any]]):
         try:
-            words = [
-                Entry(
-                    dct["word"],
-                    dct["definition"],
-                    dct.get("gender", None),
-                    dct.get("aspect", None),
-                    dct.get("usage", None),
-                    dct.get("part_of_speech", None),
-                    dct.get("charts", None),
-                    WordRepetition(2.5, 0, 0, date.today(), False),
-                )
-                for dct in dcts
-            ]
-            super().__init__(lang, words)
+            super().__init__(lang, [entry_from_dict(dct) for dct in dcts])
         except KeyError as err:
             raise RuntimeError(f"Key {err} not found") from err
 
@@ -155,31 +292,63 @@ class GraphicalConfig(Config):
 class TomlConfig(Config):
     """
     All entries in the TOML file.
+
+    Large files are parsed in chunks across the processes of a pool if one is given.
+    Files that are unchanged since they were last parsed are read from the cache
+    instead if one is given.
     """
 
-    def __init__(self, file_path: str):
-        try:
+    def __init__(
+        self,
+        file_path: str,
+        pool: Executor | None = None,
+        cache: ConfigCache | None = None,
+    ):
+        # The status is taken before reading so a change while the file is read is
+        # noticed the next time.
+        stat = os.stat(file_path)
+        cached = None if cache is None else cache.lookup(file_path, stat)
+        if cached is None:
             with open(file_path, "rb") as file_handle:
-                toml = load(file_handle)
-                lang = toml.get("lang", None)
-                if lang is not None and lang not in ["fr", "uk", "ru"]:
-                    raise RuntimeError(
-                        f"Language {lang} is not supported; if you would like it to "
-                        "be, please open a feature request!"
+                data = file_handle.read()
+            file_hash = hashlib.sha256(data).hexdigest()
+            if cache is not None:
+                cached = cache.lookup(file_path, stat, file_hash)
+            if cached is None:
+                (lang, words) = TomlConfig.parse(data, pool)
+                super().__init__(lang, words, file_hash)
+                if cache is not None:
+                    cache.store(
+                        file_path,
+                        stat,
+                        lang,
+                        [entry_to_row(word) for word in words],
+                        file_hash,
                     )
-                words = [
-                    Entry(
-                        dct["word"],
-                        dct["definition"],
-                        dct.get("gender", None),
-                        dct.get("aspect", None),
-                        dct.get("usage", None),
-                        dct.get("part_of_speech", None),
-                        dct.get("charts", None),
-                        WordRepetition(2.5, 0, 0, date.today(), False),
-                    )
-                    for dct in toml["words"]
-                ]
-                super().__init__(lang, words)
+                return
+        today = date.today()
+        super().__init__(
+            cached.get_lang(),
+            [entry_from_row(row, today) for row in cached.get_rows()],
+            cached.get_hash(),
+        )
+
+    @staticmethod
+    def parse(data: bytes, pool: Executor | None) -> tuple[str | None, list[Entry]]:
+        """
+        Parse the contents of a TOML file into its language and entries.
+        """
+        try:
+            (toml, entries) = stream_entries(data.decode("utf-8"), pool)
+            lang = toml.get("lang", None)
+            if lang is not None and lang not in ["fr", "uk", "ru"]:
+                raise RuntimeError(
+                    f"Language {lang} is not supported; if you would like it to "
+                    "be, please open a feature request!"
+                )
+            words = list(entries)
+            if not words and "words" not in toml:
+                raise KeyError("words")
         except KeyError as err:
             raise RuntimeError(f"Key {err} not found") from err
+        return (lang, words)
@@ -0,0 +1,209 @@
+"""
+Persistent cache of parsed vocabulary files.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import zlib
+from threading import Lock
+from typing import Any
+
+# Total size of the compressed entries kept in the cache.
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Version of the payload format. Entries stored in any other format are ignored.
+FORMAT_VERSION = 1
+
+# Word, definition, gender, aspect, usage, part of speech, charts and stale flag of an
+# entry, in the order they are passed to Entry.
+Row = tuple[str, str, str | None, str | None, str | None, str | None, Any, bool]
+ROW_FIELDS = 8
+
+
+def default_config_cache_path() -> str:
+    """
+    Get the default location of the parsed file cache following the XDG base
+    directory specification.
+    """
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(cache_home, "language-practice", "configs.sqlite")
+
+
+class CachedConfig:
+    """
+    A parsed file stored in the cache.
+    """
+
+    def __init__(self, lang: str | None, rows: list[Row], file_hash: str):
+        self.lang = lang
+        self.rows = rows
+        self.file_hash = file_hash
+
+    def get_lang(self) -> str | None:
+        """
+        Get the language of the file.
+        """
+        return self.lang
+
+    def get_rows(self) -> list[Row]:
+        """
+        Get the fields of every entry in the file.
+        """
+        return self.rows
+
+    def get_hash(self) -> str:
+        """
+        Get the content hash of the file.
+        """
+        return self.file_hash
+
+
+class ConfigCache:
+    """
+    Parsed files backed by sqlite keyed by path.
+
+    An entry is used without reading the file if its size and modification time are
+    unchanged and otherwise if the hash of its contents is unchanged. Entries are
+    stored as compressed JSON and the least recently used ones are evicted once the
+    cache grows past its maximum size.
+
+    The cache is only an optimization so any entry that cannot be stored or read is
+    treated as a miss and the file is parsed as usual.
+    """
+
+    TABLE_NAME = "parsed_configs"
+    SCHEMA = (
+        "path TEXT PRIMARY KEY NOT NULL, size INTEGER NOT NULL, "
+        "mtime INTEGER NOT NULL, hash TEXT NOT NULL, used_at REAL NOT NULL, "
+        "version INTEGER NOT NULL, payload BLOB NOT NULL"
+    )
+    # Table of an earlier version that stored marshal data.
+    LEGACY_TABLE_NAME = "configs"
+
+    def __init__(self, path: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        if path is None:
+            path = default_config_cache_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        # Files may be parsed on several threads at once.
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # Losing the tail of a cache on a crash is harmless so skip the fsyncs.
+        self.conn.execute("PRAGMA synchronous = OFF;")
+        self.conn.execute(f"DROP TABLE IF EXISTS {ConfigCache.LEGACY_TABLE_NAME};")
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {ConfigCache.TABLE_NAME} "
+            f"({ConfigCache.SCHEMA});"
+        )
+        self.conn.commit()
+
+    def lookup(
+        self, path: str, stat: os.stat_result, file_hash: str | None = None
+    ) -> CachedConfig | None:
+        """
+        Look up a parsed file by its current size and modification time or, if given,
+        by the hash of its contents.
+        """
+        try:
+            with self.lock:
+                res = self.conn.execute(
+                    f"SELECT size, mtime, hash, payload FROM {ConfigCache.TABLE_NAME} "
+                    "WHERE path = ? AND version = ?",
+                    (os.path.abspath(path), FORMAT_VERSION),
+                )
+                row = res.fetchone()
+                if row is None:
+                    return None
+                (size, mtime, cached_hash, payload) = row
+                if file_hash is None:
+                    if (size, mtime) != (stat.st_size, stat.st_mtime_ns):
+                        return None
+                elif file_hash != cached_hash:
+                    return None
+                (lang, rows) = json.loads(zlib.decompress(payload))
+                entries: list[Row] = [tuple(row) for row in rows]
+                if any(len(entry) != ROW_FIELDS for entry in entries):
+                    return None
+                self.conn.execute(
+                    f"UPDATE {ConfigCache.TABLE_NAME} SET size = ?, mtime = ?, "
+                    "used_at = ? WHERE path = ?",
+                    (
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                        time.time(),
+                        os.path.abspath(path),
+                    ),
+                )
+                self.conn.commit()
+        except (sqlite3.Error, zlib.error, ValueError, TypeError):
+            return None
+        return CachedConfig(lang, entries, cached_hash)
+
+    #  pylint: disable=too-many-arguments
+    #  pylint: disable=too-many-positional-arguments
+    def store(
+        self,
+        path: str,
+        stat: os.stat_result,
+        lang: str | None,
+        rows: list[Row],
+        file_hash: str,
+    ):
+        """
+        Store a parsed file along with the status of the file from before it was
+        read and evict the least recently used files beyond the maximum size of the
+        cache. Files with values that JSON cannot represent, such as dates, are not
+        stored.
+        """
+        try:
+            payload = zlib.compress(
+                json.dumps((lang, rows), ensure_ascii=False).encode("utf-8")
+            )
+        except (TypeError, ValueError):
+            return
+        try:
+            self.__store(path, stat, payload, file_hash)
+        except sqlite3.Error:
+            return
+
+    def __store(self, path: str, stat: os.stat_result, payload: bytes, file_hash: str):
+        """
+        Write a payload to the cache and evict the least recently used files.
+        """
+        with self.lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {ConfigCache.TABLE_NAME} (path, size, mtime, "
+                "hash, used_at, version, payload) VALUES(?, ?, ?, ?, ?, ?, ?)",
+                (
+                    os.path.abspath(path),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    file_hash,
+                    time.time(),
+                    FORMAT_VERSION,
+                    payload,
+                ),
+            )
+            res = self.conn.execute(
+                f"SELECT path, length(payload) FROM {ConfigCache.TABLE_NAME} "
+                "ORDER BY used_at DESC"
+            )
+            total = 0
+            evicted = []
+            for cached_path, length in res.fetchall():
+                total += length
+                if total > self.max_bytes:
+                    evicted.append((cached_path,))
+            self.conn.executemany(
+                f"DELETE FROM {ConfigCache.TABLE_NAME} WHERE path = ?", evicted
+            )
+            self.conn.commit()
+
+    def close(self):
+        """
+        Close connection to the cache.
+        """
+        self.conn.close()
@@ -3,11 +3,12 @@ Flashcard handling code.
 """
 
 from collections import deque
+from concurrent.futures import Future
 from datetime import date
 from random import shuffle
 
 from language_practice.config import Entry
-from language_practice.sqlite import SqliteHandle
+from language_practice.worker import DatabaseWorker
 
 
 class Flashcard:
@@ -15,7 +16,7 @@ class Flashcard:
     Handler for studying flashcards.
     """
 
-    def __init__(self, handle: SqliteHandle, words: list[Entry]):
+    def __init__(self, handle: DatabaseWorker, words: list[Entry]):
         self.handle = handle
 
         scheduled: list[Entry] = []
@@ -71,6 +72,18 @@ class Flashcard:
         else:
             self.complete.append(next_entry)
 
+    def load_charts(self, entry: Entry) -> Future[list[list[str]] | None]:
+        """
+        Load the charts of an entry on the database thread.
+        """
+        return self.handle.run(entry.get_charts)
+
+    def finish(self):
+        """
+        Start writing the grades of this session to disk without waiting for them.
+        """
+        self.handle.flush_grades(wait=False)
+
     def get_all_entries(self) -> list[Entry]:
         """
         Get all flashcard entries.
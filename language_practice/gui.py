@@ -2,6 +2,7 @@
 Graphical user interface.
 """
 
+#  pylint: disable=too-many-lines
 #  pylint: disable=wrong-import-position
 #  pylint: disable=too-few-public-methods
 
@@ -9,6 +10,8 @@ import asyncio
 import functools
 import os
 import tomllib
+from concurrent.futures import Future
+from sqlite3 import Error as SqliteError
 from sqlite3 import IntegrityError
 from threading import Thread
 from typing import Self
@@ -24,10 +27,22 @@ from gi.repository import (  # type: ignore  # pylint: disable=wrong-import-orde
     Gtk,
 )
 
-from language_practice.config import TomlConfig
+from language_practice.backup import BackupScheduler, restore, snapshot
+from language_practice.config import Config, Entry, TomlConfig
+from language_practice.config_cache import ConfigCache
 from language_practice.flashcard import Flashcard  # type: ignore
-from language_practice.sqlite import SqliteHandle
-from language_practice.web import scrape
+from language_practice.progress import ImportProgress
+from language_practice.sqlite import SearchResult, SetSummary
+from language_practice.web import scrape_iter
+from language_practice.web.cache import ResponseCache
+from language_practice.web.offline import OfflineStore
+from language_practice.web.parse import parse_pool
+from language_practice.web.scheduler import Scheduler
+from language_practice.web.session import SessionManager
+from language_practice.worker import DatabaseWorker
+
+# Number of scraped words whose charts are written to the database at once.
+STORE_BATCH_SIZE = 50
 
 
 def start_loop():
@@ -44,11 +59,19 @@ class GuiApplication(Adw.Application):
     Graphical application.
     """
 
-    def __init__(self, loop, **kwargs):
+    def __init__(
+        self,
+        loop,
+        wal: bool = False,
+        backup_interval: float | None = None,
+        **kwargs,
+    ):
         super().__init__(**kwargs)
 
         self.win: None | MainWindow = None
         self.loop = loop
+        self.wal = wal
+        self.backup_interval = backup_interval
 
         self.connect("activate", self.on_activate)
 
@@ -56,7 +79,9 @@ class GuiApplication(Adw.Application):
         """
         Handle window setup on activation of application.
         """
-        self.win = MainWindow(self.loop, application=app)
+        self.win = MainWindow(
+            self.loop, self.wal, self.backup_interval, application=app
+        )
         self.win.set_title("Language Practice")
 
         css = Gtk.CssProvider()
@@ -69,6 +94,21 @@ class GuiApplication(Adw.Application):
                 margin-right: 15px;
             }
 
+            entry.search {
+                margin-top: 15px;
+                margin-left: 15px;
+                margin-right: 15px;
+            }
+
+            box.import-progress {
+                margin-left: 15px;
+                margin-right: 15px;
+            }
+
+            label.set-count {
+                opacity: 0.7;
+            }
+
             button.main-buttons {
                 margin-top: 15px;
                 margin-bottom: 15px;
@@ -117,29 +157,63 @@ class GuiApplication(Adw.Application):
         self.win.present()
 
 
+#  pylint: disable=too-many-instance-attributes
+#  pylint: disable=too-many-public-methods
 class MainWindow(Gtk.ApplicationWindow):
     """
     Main window for GUI application.
     """
 
     # pylint: disable=too-many-statements
-    def __init__(self, loop, **kwargs):
+    # pylint: disable=too-many-locals
+    def __init__(
+        self,
+        loop,
+        wal: bool = False,
+        backup_interval: float | None = None,
+        **kwargs,
+    ):
         super().__init__(**kwargs)
 
         self.loop = loop
+        self.wal = wal
+        self.backup_interval = backup_interval
 
         self.set_default_size(600, 600)
 
-        self.handle = None
-        self.flashcard: Flashcard | None = None
+        self.handle: DatabaseWorker | None = None
+        self.backups: BackupScheduler | None = None
+        # Running imports and the database they import into. Only used on the
+        # asyncio loop.
+        self.import_tasks: dict[asyncio.Task, DatabaseWorker] = {}
+        self.study_windows: list[StudyWindow] = []
+        self.cache = ResponseCache()
+        self.config_cache = ConfigCache()
+        self.scheduler = Scheduler()
+        self.sessions = SessionManager()
+        self.parse_pool = parse_pool()
+        self.offline = OfflineStore() if OfflineStore.exists() else None
 
         vbox = Gtk.Box(spacing=6, orientation=Gtk.Orientation.VERTICAL)
 
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_placeholder_text("Search words, definitions and charts")
+        self.search_entry.set_css_classes(["search"])
+        self.search_entry.connect("search-changed", self.on_search_changed)
+        self.search_results = Gtk.ListBox()
+        self.search_results.set_selection_mode(Gtk.SelectionMode.NONE)
+        self.search_scrollable = Gtk.ScrolledWindow()
+        self.search_scrollable.set_vexpand(True)
+        self.search_scrollable.set_child(self.search_results)
+        self.search_scrollable.set_visible(False)
+
         self.flashcard_set_grid = FlashcardSetGrid()
         scrollable = Gtk.ScrolledWindow()
         scrollable.set_vexpand(True)
         scrollable.set_child(self.flashcard_set_grid)
 
+        self.import_progress_box = ImportProgressBox()
+
         button_hbox = Gtk.Box()
         select_all_button = Gtk.Button()
         select_all_button.set_icon_name("edit-select-all")
@@ -158,7 +232,10 @@ class MainWindow(Gtk.ApplicationWindow):
         button_hbox.append(start_button)
         button_hbox.set_halign(Gtk.Align.CENTER)
 
+        vbox.append(self.search_entry)
+        vbox.append(self.search_scrollable)
         vbox.append(scrollable)
+        vbox.append(self.import_progress_box)
         vbox.append(button_hbox)
 
         menu_model = Gio.Menu()
@@ -178,6 +255,16 @@ class MainWindow(Gtk.ApplicationWindow):
         self.add_action(action)
         menu_model.append("Close database", "win.db_close")
 
+        action = Gio.SimpleAction.new("db_backup")
+        action.connect("activate", self.db_backup_button)
+        self.add_action(action)
+        menu_model.append("Back up database", "win.db_backup")
+
+        action = Gio.SimpleAction.new("db_restore")
+        action.connect("activate", self.db_restore_button)
+        self.add_action(action)
+        menu_model.append("Restore database", "win.db_restore")
+
         action = Gio.SimpleAction.new("import")
         action.connect("activate", self.import_button)
         self.add_action(action)
@@ -188,6 +275,11 @@ class MainWindow(Gtk.ApplicationWindow):
         self.add_action(action)
         menu_model.append("Delete set", "win.delete")
 
+        action = Gio.SimpleAction.new("cache_stats")
+        action.connect("activate", self.cache_stats_button)
+        self.add_action(action)
+        menu_model.append("Download cache statistics", "win.cache_stats")
+
         popover = Gtk.PopoverMenu()
         popover.set_menu_model(menu_model)
         popover.set_position(Gtk.PositionType.BOTTOM)
@@ -208,12 +300,66 @@ class MainWindow(Gtk.ApplicationWindow):
         self.connect("destroy", self.on_destroy)
 
     #  pylint: disable=unused-argument
-    def on_destroy(self):
+    def on_destroy(self, window):
         """
         Cleanup handler for application.
         """
-        if self.handle is not None:
-            self.handle.close()
+        # The application is exiting so wait for the grades to be written.
+        self.close_database().result()
+        self.cache.close()
+        self.config_cache.close()
+        self.parse_pool.shutdown(cancel_futures=True)
+        asyncio.run_coroutine_threadsafe(self.sessions.close(), self.loop).result(5)
+        if self.offline is not None:
+            self.offline.close()
+
+    #  pylint: disable=unused-argument
+    def on_search_changed(self, entry):
+        """
+        Search the open database as the user types.
+        """
+        text = self.search_entry.get_text()
+        if self.handle is None or not text.strip():
+            self.show_search_results([])
+            return
+        self.handle.search(text).add_done_callback(
+            functools.partial(GLib.idle_add, self.search_done, self.handle, text)
+        )
+
+    def search_done(
+        self, handle: DatabaseWorker, text: str, future: Future[list[SearchResult]]
+    ):
+        """
+        Show the results of a search unless the search text changed since.
+        """
+        if handle is not self.handle or text != self.search_entry.get_text():
+            return
+        try:
+            results = future.result()
+        except (SqliteError, RuntimeError) as err:
+            dialog = Gtk.AlertDialog()
+            dialog.set_message(f"Search failed: {err}")
+            dialog.set_modal(True)
+            dialog.choose()
+            return
+        self.show_search_results(results)
+
+    def show_search_results(self, results: list[SearchResult]):
+        """
+        Replace the shown search results.
+        """
+        child = self.search_results.get_first_child()
+        while child is not None:
+            self.search_results.remove(child)
+            child = self.search_results.get_first_child()
+        for result in results:
+            label = Gtk.Label(halign=Gtk.Align.START)
+            label.set_text(
+                f"{result.get_word()}: {result.get_definition()} "
+                f"({result.get_file_name()})"
+            )
+            self.search_results.append(label)
+        self.search_scrollable.set_visible(len(results) > 0)
 
     #  pylint: disable=unused-argument
     def db_create_button(self, action, param):
@@ -234,7 +380,7 @@ class MainWindow(Gtk.ApplicationWindow):
         """
         Database creation callback.
         """
-        self.handle = SqliteHandle(source.save_finish(res).get_path())
+        self.open_database(source.save_finish(res).get_path())
 
     #  pylint: disable=unused-argument
     def db_import_button(self, action, param):
@@ -255,12 +401,97 @@ class MainWindow(Gtk.ApplicationWindow):
         """
         Database import callback.
         """
-        self.handle = SqliteHandle(source.open_finish(res).get_path())
-        sets = self.handle.get_all_sets()
-        for flashcard_set in sets:
-            label = Gtk.Label(halign=Gtk.Align.START)
-            label.set_text(flashcard_set)
-            self.flashcard_set_grid.add_row(Gtk.CheckButton(), label)
+        self.open_database(source.open_finish(res).get_path())
+        self.load_sets()
+
+    def open_database(self, path: str):
+        """
+        Open a database and start taking scheduled snapshots of it if requested.
+        """
+        self.handle = DatabaseWorker(path, wal=self.wal)
+        if self.backup_interval is not None:
+            self.backups = BackupScheduler(self.handle, interval=self.backup_interval)
+
+    def close_database(self) -> Future[None]:
+        """
+        Close the open database without blocking the main loop. Returns a future
+        that completes once the database is closed.
+        """
+        handle = self.handle
+        backups = self.backups
+        self.handle = None
+        self.backups = None
+        return asyncio.run_coroutine_threadsafe(
+            self.shutdown_database(handle, backups), self.loop
+        )
+
+    async def shutdown_database(
+        self, handle: DatabaseWorker | None, backups: BackupScheduler | None
+    ):
+        """
+        Stop scheduled snapshots and the imports into a database, then close it.
+        """
+        if backups is not None:
+            await asyncio.to_thread(backups.stop)
+        if handle is None:
+            return
+        tasks = [task for task, target in self.import_tasks.items() if target is handle]
+        for task in tasks:
+            task.cancel()
+        # Imports must not submit work to the worker once it is closed.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.wrap_future(handle.close())
+
+    def load_sets(self):
+        """
+        Load the flashcard sets of the open database into the grid.
+        """
+        assert self.handle is not None
+        self.handle.get_set_summaries().add_done_callback(
+            functools.partial(GLib.idle_add, self.show_sets, self.handle)
+        )
+
+    def show_sets(self, handle: DatabaseWorker, future: Future[list[SetSummary]]):
+        """
+        Add the flashcard sets of an opened database to the grid.
+        """
+        if handle is not self.handle:
+            return
+        try:
+            summaries = future.result()
+        except (SqliteError, RuntimeError) as err:
+            dialog = Gtk.AlertDialog()
+            dialog.set_message(f"Could not open database: {err}")
+            dialog.set_modal(True)
+            dialog.choose()
+            return
+        for summary in summaries:
+            self.add_set_row(summary.get_file_name())
+        self.flashcard_set_grid.set_summaries(summaries)
+
+    def refresh_summaries(self):
+        """
+        Update the word counts shown for each flashcard set.
+        """
+        if self.handle is not None:
+            self.handle.get_set_summaries().add_done_callback(
+                functools.partial(GLib.idle_add, self.show_summaries, self.handle)
+            )
+
+    def show_summaries(self, handle: DatabaseWorker, future: Future[list[SetSummary]]):
+        """
+        Show updated word counts unless the database was closed since.
+        """
+        if handle is self.handle and future.exception() is None:
+            self.flashcard_set_grid.set_summaries(future.result())
+
+    def add_set_row(self, set_name: str):
+        """
+        Add a flashcard set to the grid.
+        """
+        label = Gtk.Label(halign=Gtk.Align.START)
+        label.set_text(set_name)
+        self.flashcard_set_grid.add_row(Gtk.CheckButton(), label)
 
     #  pylint: disable=unused-argument
     def db_close_button(self, action, param):
@@ -273,9 +504,112 @@ class MainWindow(Gtk.ApplicationWindow):
             dialog.set_modal(True)
             dialog.choose()
             return
+        self.import_progress_box.cancel_all()
         self.flashcard_set_grid.clear()
-        self.handle.close()
-        self.handle = None
+        self.show_search_results([])
+        self.close_database()
+
+    #  pylint: disable=unused-argument
+    def db_backup_button(self, action, param):
+        """
+        Handle database backup button action.
+        """
+        if self.handle is None:
+            dialog = Gtk.AlertDialog()
+            dialog.set_message("Must create or import database first")
+            dialog.set_modal(True)
+            dialog.choose()
+            return
+        file_chooser = Gtk.FileDialog()
+        file_chooser.save(self, None, self.backup_to, None)
+
+    #  pylint: disable=unused-argument
+    def backup_to(self, source, res, data):
+        """
+        Database backup callback.
+        """
+        if self.handle is None:
+            return
+        path = source.save_finish(res).get_path()
+        # The copy runs off the worker thread so studying can continue meanwhile.
+        asyncio.run_coroutine_threadsafe(
+            asyncio.to_thread(snapshot, self.handle, path), self.loop
+        ).add_done_callback(functools.partial(GLib.idle_add, self.backup_done, path))
+
+    def backup_done(self, path: str, future: Future[None]):
+        """
+        Report the result of a backup.
+        """
+        err = future.exception()
+        dialog = Gtk.AlertDialog()
+        if err is None:
+            dialog.set_message(f"Backed up database to {path}")
+        else:
+            dialog.set_message(f"Could not back up database: {err}")
+        dialog.set_modal(True)
+        dialog.choose()
+
+    #  pylint: disable=unused-argument
+    def db_restore_button(self, action, param):
+        """
+        Handle database restore button action.
+        """
+        if self.handle is None:
+            dialog = Gtk.AlertDialog()
+            dialog.set_message("Must create or import database first")
+            dialog.set_modal(True)
+            dialog.choose()
+            return
+        if self.study_windows:
+            dialog = Gtk.AlertDialog()
+            dialog.set_message("Finish studying before restoring the database")
+            dialog.set_modal(True)
+            dialog.choose()
+            return
+        file_chooser = Gtk.FileDialog()
+        file_chooser.open(self, None, self.restore_from, None)
+
+    #  pylint: disable=unused-argument
+    def restore_from(self, source, res, data):
+        """
+        Database restore callback.
+        """
+        if self.handle is None:
+            return
+        snapshot_path = source.open_finish(res).get_path()
+        path = self.handle.get_path()
+        self.import_progress_box.cancel_all()
+        self.flashcard_set_grid.clear()
+        self.show_search_results([])
+        # Cached charts and strings would be stale after the restore so the database
+        # is closed and opened again.
+        closed = self.close_database()
+        asyncio.run_coroutine_threadsafe(
+            self.restore_database(closed, snapshot_path, path), self.loop
+        ).add_done_callback(functools.partial(GLib.idle_add, self.restore_done, path))
+
+    async def restore_database(
+        self, closed: Future[None], snapshot_path: str, path: str
+    ):
+        """
+        Restore a database from a snapshot once it has been closed.
+        """
+        await asyncio.wrap_future(closed)
+        await asyncio.to_thread(restore, snapshot_path, path)
+
+    def restore_done(self, path: str, future: Future[None]):
+        """
+        Open the database again once it has been restored.
+        """
+        err = future.exception()
+        if err is not None:
+            dialog = Gtk.AlertDialog()
+            dialog.set_message(f"Could not restore database: {err}")
+            dialog.set_modal(True)
+            dialog.choose()
+        if self.handle is None:
+            self.open_database(path)
+            self.load_sets()
 
     #  pylint: disable=unused-argument
     def import_button(self, action, param):
@@ -306,92 +640,149 @@ class MainWindow(Gtk.ApplicationWindow):
         selected = self.flashcard_set_grid.get_selected()
         selected.sort(reverse=True, key=lambda info: info[1])
         for text, row in selected:
-            set_id = self.handle.get_id_from_file_name(text)
-            if set_id is not None:
-                self.handle.delete_set(set_id)
+            self.handle.delete_set(text)
             self.flashcard_set_grid.delete_row(row)
 
+    #  pylint: disable=unused-argument
+    def cache_stats_button(self, action, param):
+        """
+        Handle download cache statistics button action.
+        """
+        dialog = Gtk.AlertDialog()
+        dialog.set_message(self.cache.report())
+        dialog.set_modal(True)
+        dialog.choose()
+
     def handle_files(self, dialog: Gtk.FileDialog, task: Gio.Task):
         """
         Handle importing files on button press.
         """
         imports = [entry.get_path() for entry in dialog.open_multiple_finish(task)]
+        # The import button only opens the file dialog with a database open.
+        assert self.handle is not None
 
+        # Every file is imported by its own coroutine. Files are read on threads and
+        # parsed in the process pool so the imports run side by side instead of
+        # waiting on each other's parsing.
         for current_import in imports:
+            (set_name, _) = os.path.splitext(os.path.basename(current_import))
+            progress = ImportProgress(set_name)
+            self.import_progress_box.add_import(progress)
             fut = asyncio.run_coroutine_threadsafe(
-                self.handle_single_import(current_import), self.loop
+                self.run_import(self.handle, current_import, progress),
+                self.loop,
             )
             fut.add_done_callback(
                 functools.partial(
-                    GLib.idle_add, self.update_ui_when_done, current_import
+                    GLib.idle_add, self.update_ui_when_done, current_import, progress
                 )
             )
 
-    async def handle_single_import(self, current_import: str):
+    async def run_import(
+        self, handle: DatabaseWorker, current_import: str, progress: ImportProgress
+    ):
         """
-        Handle TOML parsing and web scraping.
+        Run an import, keeping track of it so it can be cancelled when the database
+        is closed.
         """
+        task = asyncio.current_task()
+        assert task is not None
+        self.import_tasks[task] = handle
         try:
-            toml = TomlConfig(current_import)
-        except tomllib.TOMLDecodeError as err:
-            dialog = Gtk.AlertDialog()
-            dialog.set_message(f"{current_import}: {err}")
-            dialog.set_modal(True)
-            dialog.choose()
-            return (None, None)
-        except UnicodeDecodeError as err:
-            dialog = Gtk.AlertDialog()
-            dialog.set_message(f"{current_import}: {err}")
-            dialog.set_modal(True)
-            dialog.choose()
-            return (None, None)
-        except RuntimeError as err:
-            dialog = Gtk.AlertDialog()
-            dialog.set_message(f"{current_import}: {err}")
-            dialog.set_modal(True)
-            dialog.choose()
-            return (None, None)
+            await self.handle_single_import(handle, current_import, progress)
+        finally:
+            del self.import_tasks[task]
+            # Finish the progress even if the import was cancelled or failed so it
+            # never waits forever.
+            progress.finish()
+
+    async def handle_single_import(
+        self, handle: DatabaseWorker, current_import: str, progress: ImportProgress
+    ):
+        """
+        Handle TOML parsing and web scraping of words that do not have charts stored
+        yet. The words are imported first and their charts are then stored in batches
+        as they are scraped. All database access happens on the database thread.
 
-        return (toml, await scrape(toml.get_words(), toml.get_lang()))
+        The file is loaded on a thread so it never blocks the event loop. Errors are
+        raised as RuntimeError and shown once the import is done.
+        """
+        (set_name, _) = os.path.splitext(os.path.basename(current_import))
+        try:
+            (stored, toml) = await asyncio.gather(
+                asyncio.wrap_future(handle.get_charted_words(set_name)),
+                asyncio.to_thread(
+                    TomlConfig, current_import, self.parse_pool, self.config_cache
+                ),
+            )
+        except (tomllib.TOMLDecodeError, UnicodeDecodeError, OSError) as err:
+            raise RuntimeError(f"{err}") from err
+
+        try:
+            new = await asyncio.wrap_future(handle.import_set(set_name, toml, {}))
+        except (IntegrityError, RuntimeError) as err:
+            await asyncio.wrap_future(handle.delete_set(set_name))
+            raise RuntimeError(f"{err}") from err
+        if new:
+            GLib.idle_add(self.add_imported_set, handle, set_name)
+
+        batch = {}
+        async for word, charts in scrape_iter(
+            toml.get_words(),
+            toml.get_lang(),
+            self.cache,
+            self.scheduler,
+            self.parse_pool,
+            bulk=True,
+            offline=self.offline,
+            stored=stored,
+            progress=progress,
+            sessions=self.sessions,
+        ):
+            batch[word] = charts
+            if len(batch) >= STORE_BATCH_SIZE:
+                progress.record_stored(
+                    await asyncio.wrap_future(handle.store_charts(set_name, batch))
+                )
+                batch = {}
+        if batch:
+            progress.record_stored(
+                await asyncio.wrap_future(handle.store_charts(set_name, batch))
+            )
 
-    def update_ui_when_done(self, current_import, future):
+    def add_imported_set(self, handle: DatabaseWorker, set_name: str):
+        """
+        Add a newly imported set to the grid unless the database was closed since.
+        """
+        if handle is self.handle:
+            self.add_set_row(set_name)
+
+    def update_ui_when_done(self, current_import, progress, future):
         """
         Handle updating the UI on future completion.
         """
-        (toml, scraped) = future.result(10)
-        if toml is None or scraped is None:
+        progress.finish()
+        self.refresh_summaries()
+        if future.cancelled():
+            # The database was closed during the import.
             return
-
-        (set_name, _) = os.path.splitext(os.path.basename(current_import))
         try:
-            new = self.handle.import_set(
-                set_name,
-                toml,
-                scraped,
-            )
-        except IntegrityError as err:
+            future.result()
+        except RuntimeError as err:
             dialog = Gtk.AlertDialog()
             dialog.set_message(f"{current_import}: {err}")
             dialog.set_modal(True)
             dialog.choose()
-            set_id = self.handle.get_id_from_file_name(set_name)
-            if set_id is not None:
-                self.handle.delete_set(set_id)
             return
-        except RuntimeError as err:
+
+        failed = progress.get_failed()
+        if failed:
             dialog = Gtk.AlertDialog()
-            dialog.set_message(f"{current_import}: {err}")
+            dialog.set_message(
+                f"{current_import}: could not download charts for {', '.join(failed)}"
+            )
             dialog.set_modal(True)
             dialog.choose()
-            set_id = self.handle.get_id_from_file_name(set_name)
-            if set_id is not None:
-                self.handle.delete_set(set_id)
-            return
-
-        if new:
-            label = Gtk.Label(halign=Gtk.Align.START)
-            label.set_text(set_name)
-            self.flashcard_set_grid.add_row(Gtk.CheckButton(), label)
 
     #  pylint: disable=unused-argument
     def handle_start(self, button):
@@ -405,24 +796,48 @@ class MainWindow(Gtk.ApplicationWindow):
             dialog.choose()
             return
         files = self.flashcard_set_grid.get_selected()
-        config = None
-        for text, _ in files:
-            if config is None:
-                config = self.handle.load_config(text)
-            else:
-                config = config.extend(self.handle.load_config(text))
+        self.handle.load_config([text for text, _ in files]).add_done_callback(
+            functools.partial(GLib.idle_add, self.start_study, self.handle)
+        )
+
+    def start_study(self, handle: DatabaseWorker, future: Future[Config | None]):
+        """
+        Open the study window once the due words have been loaded.
+        """
+        if handle is not self.handle:
+            return
+        try:
+            config = future.result()
+        except (SqliteError, RuntimeError) as err:
+            dialog = Gtk.AlertDialog()
+            dialog.set_message(f"{err}")
+            dialog.set_modal(True)
+            dialog.choose()
+            return
 
         if config is not None:
-            self.flashcard = Flashcard(self.handle, config.get_words())
-            win = StudyWindow(self.flashcard)
+            win = StudyWindow(Flashcard(handle, config.get_words()))
+            win.connect("close-request", self.on_study_close_request)
+            self.study_windows.append(win)
             win.present()
 
+    #  pylint: disable=unused-argument
+    def on_study_close_request(self, window) -> bool:
+        """
+        Update the word counts once studying is done.
+        """
+        self.study_windows.remove(window)
+        self.refresh_summaries()
+        return False
+
 
 class FlashcardSetGrid(Gtk.Grid):
     """
     Grid used for flashcard sets.
     """
 
+    COUNT_NAMES = ["due", "review", "new", "total"]
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -436,8 +851,32 @@ class FlashcardSetGrid(Gtk.Grid):
         """
         self.attach(checkbox, 0, self.num_rows, 1, 1)
         self.attach(label, 1, self.num_rows, 1, 1)
+        for i in range(len(FlashcardSetGrid.COUNT_NAMES)):
+            count = Gtk.Label(halign=Gtk.Align.END)
+            count.set_css_classes(["set-count"])
+            self.attach(count, 2 + i, self.num_rows, 1, 1)
         self.num_rows += 1
 
+    def set_summaries(self, summaries: list[SetSummary]):
+        """
+        Show the number of due, review, new and total words next to each set.
+        """
+        by_name = {summary.get_file_name(): summary for summary in summaries}
+        for row in range(self.num_rows):
+            summary = by_name.get(self.get_child_at(1, row).get_text(), None)
+            if summary is None:
+                continue
+            counts = [
+                summary.get_due(),
+                summary.get_review(),
+                summary.get_new(),
+                summary.get_total(),
+            ]
+            for i, (count, name) in enumerate(
+                zip(counts, FlashcardSetGrid.COUNT_NAMES)
+            ):
+                self.get_child_at(2 + i, row).set_text(f"{count} {name}")
+
     def delete_row(self, row):
         """
         Delete a row from the grid.
@@ -481,6 +920,61 @@ class FlashcardSetGrid(Gtk.Grid):
             self.delete_row(i)
 
 
+class ImportProgressBox(Gtk.Box):
+    """
+    Box showing the progress of all running imports.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.set_orientation(Gtk.Orientation.VERTICAL)
+        self.set_spacing(6)
+        self.set_css_classes(["import-progress"])
+        self.rows: list[tuple[ImportProgress, Gtk.Box, Gtk.ProgressBar]] = []
+
+    def add_import(self, progress: ImportProgress):
+        """
+        Add a row with a progress progress_bar and a cancel button for an import.
+        """
+        row = Gtk.Box(spacing=6)
+        progress_bar = Gtk.ProgressBar()
+        progress_bar.set_show_text(True)
+        progress_bar.set_text(progress.report())
+        progress_bar.set_hexpand(True)
+        row.append(progress_bar)
+        cancel = Gtk.Button()
+        cancel.set_icon_name("process-stop")
+        cancel.connect("clicked", lambda button: progress.cancel())
+        row.append(cancel)
+        self.append(row)
+
+        self.rows.append((progress, row, progress_bar))
+        if len(self.rows) == 1:
+            GLib.timeout_add(250, self.refresh)
+
+    def refresh(self) -> bool:
+        """
+        Update all progress bars and remove the rows of finished imports. Returns
+        whether there is anything left to refresh.
+        """
+        for progress, row, progress_bar in list(self.rows):
+            if progress.is_done():
+                self.remove(row)
+                self.rows.remove((progress, row, progress_bar))
+            else:
+                progress_bar.set_fraction(progress.get_fraction())
+                progress_bar.set_text(progress.report())
+        return len(self.rows) > 0
+
+    def cancel_all(self):
+        """
+        Request cancellation of all running imports.
+        """
+        for progress, _, _ in self.rows:
+            progress.cancel()
+
+
 class StudyWindow(Gtk.ApplicationWindow):
     """
     Window for studying flashcards.
@@ -493,6 +987,7 @@ class StudyWindow(Gtk.ApplicationWindow):
 
         self.set_title("Language Practice")
         self.flashcard = flashcard
+        self.connect("close-request", self.on_close_request)
 
         (self.peek, self.is_review) = self.flashcard.current()
         if self.peek is not None:
@@ -519,6 +1014,14 @@ class StudyWindow(Gtk.ApplicationWindow):
             label.set_css_classes("word")
             self.set_child(label)
 
+    #  pylint: disable=unused-argument
+    def on_close_request(self, window) -> bool:
+        """
+        Save grades when the study window is closed.
+        """
+        self.flashcard.finish()
+        return False
+
     def grade_button_box(self) -> Gtk.Box:
         """
         Set up button box for grading.
@@ -658,8 +1161,17 @@ class StudyWindow(Gtk.ApplicationWindow):
         Handle usage button press.
         """
         if self.peek is not None:
+            self.flashcard.load_charts(self.peek).add_done_callback(
+                functools.partial(GLib.idle_add, self.show_charts, self.peek)
+            )
+
+    def show_charts(self, entry: Entry, future: Future[list[list[str]] | None]):
+        """
+        Display charts once they have been loaded.
+        """
+        if entry is self.peek:
             vbox = Gtk.Box(spacing=6, orientation=Gtk.Orientation.VERTICAL)
-            charts = self.peek.get_charts()
+            charts = future.result()
             if charts is not None:
                 for chart in charts:
                     grid = Gtk.Grid()
@@ -0,0 +1,169 @@
+"""
+Write-behind journal for grades.
+"""
+
+import sqlite3
+from threading import Condition, Thread
+from typing import Any
+
+# Seconds a grade may wait before it is written to disk.
+DEFAULT_INTERVAL = 2.0
+# Number of pending grades that triggers a write before the interval elapses.
+DEFAULT_MAX_PENDING = 32
+# Seconds a connection waits for another one to release its lock on the database
+# before giving up. An import holds the lock for its whole transaction so this is
+# generous.
+BUSY_TIMEOUT = 60.0
+
+
+class GradeJournal:
+    """
+    Batches grade updates in memory and writes them from a background thread so
+    grading a flashcard never waits on disk. Pending grades are written in a single
+    transaction when the interval elapses, when enough of them are pending, when a
+    flush is requested and when the journal is closed.
+
+    The journal writes through its own connection so a batch can never be committed
+    in the middle of a transaction on the connection of the GUI thread. Each batch
+    waits for the lock on the database up front, so while an import is in progress it
+    is written once the import commits rather than failing as locked.
+    """
+
+    #  pylint: disable=too-many-instance-attributes
+    #  pylint: disable=too-many-arguments
+    #  pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        db: str,
+        statement: str,
+        interval: float = DEFAULT_INTERVAL,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        wal: bool = False,
+    ):
+        self.db = db
+        self.statement = statement
+        self.interval = interval
+        self.max_pending = max_pending
+        self.wal = wal
+
+        self.cond = Condition()
+        # Keyed by word so grading the same word twice only writes the latest grade.
+        self.pending: dict[str, tuple[Any, ...]] = {}
+        self.requested = 0
+        self.completed = 0
+        self.closed = False
+        self.paused = False
+        self.error: sqlite3.Error | None = None
+
+        self.thread = Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def record(self, word: str, params: tuple[Any, ...]):
+        """
+        Queue the parameters of the statement for a word without waiting for them to
+        be written.
+        """
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("Grade journal is already closed")
+            self.pending[word] = params
+            if len(self.pending) >= self.max_pending:
+                self.cond.notify_all()
+
+    def __should_write(self) -> bool:
+        """
+        Check whether the background thread should write pending grades now.
+        """
+        return (
+            self.closed
+            or self.requested > self.completed
+            # After a failed write, wait for the interval before trying again.
+            or (
+                len(self.pending) >= self.max_pending
+                and self.error is None
+                and not self.paused
+            )
+        )
+
+    def __run(self):
+        """
+        Write pending grades until the journal is closed.
+        """
+        # Taking the write lock when the transaction begins means a batch never holds
+        # a read lock while it waits on another writer, in either journal mode.
+        conn = sqlite3.connect(
+            self.db, timeout=BUSY_TIMEOUT, isolation_level="IMMEDIATE"
+        )
+        if self.wal:
+            # A commit in WAL mode only needs the log to reach disk so a crash loses
+            # at most the batch that was being written.
+            conn.execute("PRAGMA synchronous = NORMAL;")
+        while True:
+            with self.cond:
+                self.cond.wait_for(self.__should_write, timeout=self.interval)
+                if self.paused and not self.closed and self.requested == self.completed:
+                    continue
+                batch = self.pending
+                self.pending = {}
+                requested = self.requested
+                closed = self.closed
+
+            error = None
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(self.statement, batch.values())
+                except sqlite3.Error as err:
+                    error = err
+
+            with self.cond:
+                if error is not None:
+                    # Keep the batch unless the same words were graded again since.
+                    self.pending = batch | self.pending
+                    self.error = error
+                else:
+                    self.error = None
+                self.completed = requested
+                self.cond.notify_all()
+            if closed:
+                break
+        conn.close()
+
+    def set_paused(self, paused: bool):
+        """
+        Hold grades in memory instead of writing them on the timer or when enough
+        of them are pending, for example while a backup is copying the database.
+        Explicit flushes and closing still write them.
+        """
+        with self.cond:
+            self.paused = paused
+            self.cond.notify_all()
+
+    def flush(self, wait: bool = True):
+        """
+        Write all pending grades, optionally waiting until they are committed.
+        """
+        with self.cond:
+            if self.closed:
+                return
+            self.requested += 1
+            requested = self.requested
+            self.cond.notify_all()
+            if not wait:
+                return
+            self.cond.wait_for(lambda: self.completed >= requested)
+            if self.error is not None:
+                raise RuntimeError(f"Failed to save grades: {self.error}")
+
+    def close(self):
+        """
+        Write all pending grades and stop the background thread.
+        """
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+        if self.error is not None:
+            raise RuntimeError(f"Failed to save grades: {self.error}")
@@ -0,0 +1,106 @@
+"""
+Progress tracking for imports.
+"""
+
+import threading
+
+
+#  pylint: disable=too-many-instance-attributes
+class ImportProgress:
+    """
+    Progress of a single import shared between the asyncio loop doing the scraping
+    and the GTK main loop storing the results and displaying progress.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.total = 0
+        self.fetched = 0
+        self.parsed = 0
+        self.stored = 0
+        self.failed: list[str] = []
+        self.done = False
+        self.cancelled = threading.Event()
+
+    def get_name(self) -> str:
+        """
+        Get name of the set being imported.
+        """
+        return self.name
+
+    def set_total(self, total: int):
+        """
+        Set number of words that need to be scraped.
+        """
+        self.total = total
+
+    def record_fetched(self):
+        """
+        Record a page that was downloaded or read from a cache.
+        """
+        self.fetched += 1
+
+    def record_parsed(self):
+        """
+        Record charts that were parsed from a page.
+        """
+        self.parsed += 1
+
+    def record_stored(self, count: int = 1):
+        """
+        Record charts that were written to the database.
+        """
+        self.stored += count
+
+    def record_failed(self, word: str):
+        """
+        Record a word whose charts could not be retrieved.
+        """
+        self.failed.append(word)
+
+    def finish(self):
+        """
+        Mark the import as finished.
+        """
+        self.done = True
+
+    def cancel(self):
+        """
+        Request cancellation of the import.
+        """
+        self.cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        """
+        Check whether cancellation of the import was requested.
+        """
+        return self.cancelled.is_set()
+
+    def is_done(self) -> bool:
+        """
+        Check whether the import has finished.
+        """
+        return self.done
+
+    def get_failed(self) -> list[str]:
+        """
+        Get all words whose charts could not be retrieved.
+        """
+        return self.failed
+
+    def get_fraction(self) -> float:
+        """
+        Get fraction of the words that have been stored or have failed.
+        """
+        if self.total == 0:
+            return 1.0 if self.done else 0.0
+        return min(1.0, (self.stored + len(self.failed)) / self.total)
+
+    def report(self) -> str:
+        """
+        Get a human readable summary of the import's progress.
+        """
+        return (
+            f"{self.name}: {self.fetched} fetched, {self.parsed} parsed, "
+            f"{self.stored} stored, {len(self.failed)} failed of {self.total}"
+        )
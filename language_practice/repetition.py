@@ -13,6 +13,14 @@ class WordRepetition:
 
     DEFAULT_EASYNESS_FACTOR = 2.5
 
+    __slots__ = (
+        "easiness_factor",
+        "num_correct",
+        "in_n_days",
+        "date_of_next",
+        "should_review",
+    )
+
     #  pylint: disable=too-many-arguments
     #  pylint: disable=too-many-positional-arguments
     def __init__(
@@ -2,12 +2,109 @@
 Database code
 """
 
+#  pylint: disable=too-many-lines
+
+import hashlib
+import itertools
+import json
 import sqlite3
-import uuid
+import zlib
+from collections import Counter, OrderedDict
 from datetime import date
-from typing import Any
+from typing import Any, Iterator
 
 from language_practice.config import Config, Entry, WordRepetition
+from language_practice.journal import BUSY_TIMEOUT, GradeJournal
+
+# Number of words whose charts are kept in memory once loaded.
+CHART_CACHE_SIZE = 64
+# Maximum number of search results returned at once.
+SEARCH_LIMIT = 100
+# Number of values bound per statement when querying lists of keys, well below the
+# default limit of 999 host parameters of older sqlite versions.
+CHUNK_SIZE = 500
+
+
+def chunks(items: list[Any]) -> Iterator[list[Any]]:
+    """
+    Split a list into chunks small enough to bind in a single statement.
+    """
+    for i in range(0, len(items), CHUNK_SIZE):
+        yield items[i : i + CHUNK_SIZE]
+
+
+class SetSummary:
+    """
+    Number of words in a flashcard set by study state.
+    """
+
+    #  pylint: disable=too-many-arguments
+    #  pylint: disable=too-many-positional-arguments
+    def __init__(self, file_name: str, due: int, review: int, new: int, total: int):
+        self.file_name = file_name
+        self.due = due
+        self.review = review
+        self.new = new
+        self.total = total
+
+    def get_file_name(self) -> str:
+        """
+        Get name of the flashcard set.
+        """
+        return self.file_name
+
+    def get_due(self) -> int:
+        """
+        Get number of words scheduled for today or earlier.
+        """
+        return self.due
+
+    def get_review(self) -> int:
+        """
+        Get number of words that need to be reviewed.
+        """
+        return self.review
+
+    def get_new(self) -> int:
+        """
+        Get number of words that have never been studied.
+        """
+        return self.new
+
+    def get_total(self) -> int:
+        """
+        Get number of words in the flashcard set.
+        """
+        return self.total
+
+
+class SearchResult:
+    """
+    A word matching a search.
+    """
+
+    def __init__(self, word: str, definition: str, file_name: str):
+        self.word = word
+        self.definition = definition
+        self.file_name = file_name
+
+    def get_word(self) -> str:
+        """
+        Get word.
+        """
+        return self.word
+
+    def get_definition(self) -> str:
+        """
+        Get definition.
+        """
+        return self.definition
+
+    def get_file_name(self) -> str:
+        """
+        Get name of the flashcard set containing the word.
+        """
+        return self.file_name
 
 
 class SqliteHandle:
@@ -17,339 +114,896 @@ class SqliteHandle:
 
     FLASHCARDS_TABLE_NAME = "flashcard_sets"
     FLASHCARDS_SCHEMA = (
-        "id INTEGER PRIMARY KEY AUTOINCREMENT, file_name TEXT, lang TEXT"
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, file_name TEXT, lang TEXT, "
+        "file_hash TEXT"
     )
     WORD_TABLE_NAME = "words"
     WORD_SCHEMA = (
         "word TEXT PRIMARY KEY NOT NULL, definition TEXT NOT NULL, gender TEXT, "
         "aspect TEXT, usage TEXT, part_of_speech TEXT, easiness_factor REAL, "
         "num_correct INTEGER, in_n_days INTEGER, date_of_next TEXT, review NUMERIC, "
-        "flashcard_set_id INTEGER, table_uuids TEXT"
+        "flashcard_set_id INTEGER, entry_hash TEXT, scraped NUMERIC NOT NULL DEFAULT 0"
+    )
+    CHARTS_TABLE_NAME = "charts"
+    CHARTS_SCHEMA = (
+        "id INTEGER PRIMARY KEY, hash TEXT UNIQUE NOT NULL, refcount INTEGER NOT NULL, "
+        "payload BLOB"
+    )
+    # Chart cells shared between charts, such as headers and common endings, are
+    # stored once here and referenced by ID from the chart payloads. The refcount is
+    # the number of charts referring to a string.
+    STRINGS_TABLE_NAME = "strings"
+    STRINGS_SCHEMA = (
+        "id INTEGER PRIMARY KEY, value TEXT UNIQUE NOT NULL, "
+        "refcount INTEGER NOT NULL DEFAULT 0"
+    )
+    # Full text index of words keyed by the rowid of the word. Diacritics such as
+    # stress marks and accents are ignored and prefixes of two and three characters
+    # are indexed so that searching as you type stays fast.
+    SEARCH_TABLE_NAME = "search"
+    SEARCH_SCHEMA = (
+        "word, definition, usage, forms, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+    )
+    # Only read when migrating databases created before version 2.
+    CHART_CELLS_TABLE_NAME = "chart_cells"
+    WORD_CHARTS_TABLE_NAME = "word_charts"
+    WORD_CHARTS_SCHEMA = (
+        "word TEXT NOT NULL, position INTEGER NOT NULL, chart_id INTEGER NOT NULL, "
+        "PRIMARY KEY (word, position)"
+    )
+    WORD_DUE_INDEX_NAME = "words_due"
+    # Also covers in_n_days so that set summaries never read the words themselves.
+    WORD_DUE_INDEX_COLUMNS = "flashcard_set_id, review, date_of_next, in_n_days"
+    # Version 1 moved charts from one table per chart into chart_cells. Version 2
+    # replaced chart_cells with compressed payloads referencing shared strings.
+    # Version 3 counts the references to shared strings. Version 4 added in_n_days
+    # to the index of due words.
+    SCHEMA_VERSION = 4
+    # Payload of a chart without any cells.
+    EMPTY_CHART = zlib.compress(b"[]")
+
+    # Statements have a fixed shape so sqlite's statement cache can reuse them.
+    INSERT_WORD = (
+        f"INSERT OR IGNORE INTO {WORD_TABLE_NAME} (word, definition, gender, aspect, "
+        "usage, part_of_speech, easiness_factor, num_correct, in_n_days, "
+        "date_of_next, review, flashcard_set_id, entry_hash) "
+        "VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    UPDATE_WORD = (
+        f"UPDATE {WORD_TABLE_NAME} SET definition = ?, "
+        "gender = COALESCE(?, gender), aspect = COALESCE(?, aspect), "
+        "usage = COALESCE(?, usage), part_of_speech = COALESCE(?, part_of_speech), "
+        "entry_hash = ? WHERE word = ?"
+    )
+    INSERT_CHART = (
+        f"INSERT INTO {CHARTS_TABLE_NAME} (hash, refcount, payload) VALUES(?, 0, ?)"
+    )
+    INSERT_WORD_CHART = (
+        f"INSERT INTO {WORD_CHARTS_TABLE_NAME} (word, position, chart_id) "
+        "VALUES(?, ?, ?)"
+    )
+    UPDATE_REPETITION = (
+        f"UPDATE {WORD_TABLE_NAME} SET easiness_factor = ?, num_correct = ?, "
+        "in_n_days = ?, date_of_next = ?, review = ? WHERE word = ?"
+    )
+    # Words due for study in a set: everything marked for review plus everything
+    # scheduled for today or earlier. The two halves are separate equality lookups
+    # on words_due; an OR would fall back to scanning the whole set.
+    DUE_WORDS = (
+        "SELECT {columns} FROM "
+        f"{WORD_TABLE_NAME} WHERE flashcard_set_id = :set_id AND review = 1 "
+        "UNION ALL SELECT {columns} FROM "
+        f"{WORD_TABLE_NAME} WHERE flashcard_set_id = :set_id AND review = 0 "
+        "AND date_of_next <= :today"
     )
 
-    def __init__(self, db: str):
-        self.conn = sqlite3.connect(db)
+    def __init__(
+        self, db: str, chart_cache_size: int = CHART_CACHE_SIZE, wal: bool = False
+    ):
+        self.conn = sqlite3.connect(db, timeout=BUSY_TIMEOUT)
         self.cursor = self.conn.cursor()
+        if wal:
+            self.cursor.execute("PRAGMA journal_mode = WAL;")
+        # Charts of recently studied words, least recently used first.
+        self.chart_cache: OrderedDict[str, list[Any]] = OrderedDict()
+        self.chart_cache_size = chart_cache_size
+        # Shared chart cells by string ID.
+        self.strings: dict[int, str] = {}
 
         self.__create_table(
             SqliteHandle.FLASHCARDS_TABLE_NAME, SqliteHandle.FLASHCARDS_SCHEMA
         )
+        self.__create_table(SqliteHandle.WORD_TABLE_NAME, SqliteHandle.WORD_SCHEMA)
+        self.__create_table(SqliteHandle.CHARTS_TABLE_NAME, SqliteHandle.CHARTS_SCHEMA)
+        self.__create_table(
+            SqliteHandle.STRINGS_TABLE_NAME, SqliteHandle.STRINGS_SCHEMA
+        )
+        self.__create_table(
+            SqliteHandle.WORD_CHARTS_TABLE_NAME,
+            SqliteHandle.WORD_CHARTS_SCHEMA,
+            without_rowid=True,
+        )
+        self.__create_index(
+            SqliteHandle.WORD_DUE_INDEX_NAME,
+            SqliteHandle.WORD_TABLE_NAME,
+            SqliteHandle.WORD_DUE_INDEX_COLUMNS,
+        )
+        self.__add_column(SqliteHandle.FLASHCARDS_TABLE_NAME, "file_hash", "TEXT")
+        self.__add_column(SqliteHandle.WORD_TABLE_NAME, "entry_hash", "TEXT")
+        self.__add_column(
+            SqliteHandle.WORD_TABLE_NAME, "scraped", "NUMERIC NOT NULL DEFAULT 0"
+        )
+        self.__add_column(SqliteHandle.CHARTS_TABLE_NAME, "payload", "BLOB")
+        self.__add_column(
+            SqliteHandle.STRINGS_TABLE_NAME, "refcount", "INTEGER NOT NULL DEFAULT 0"
+        )
+        rewritten = self.__migrate()
+        self.conn.commit()
+        if rewritten:
+            # Give the space of the old chart storage back to the file system.
+            self.cursor.execute("VACUUM;")
+
+        # The search index is optional as sqlite may be built without FTS5.
+        self.search_enabled = True
+        if not self.__table_exists(SqliteHandle.SEARCH_TABLE_NAME):
+            try:
+                self.cursor.execute(
+                    f"CREATE VIRTUAL TABLE '{SqliteHandle.SEARCH_TABLE_NAME}' USING "
+                    f"fts5({SqliteHandle.SEARCH_SCHEMA});"
+                )
+                rewritten = True
+            except sqlite3.OperationalError:
+                self.search_enabled = False
+        if rewritten and self.search_enabled:
+            # VACUUM may renumber the rowids the search index refers to.
+            self.__rebuild_search()
+        self.conn.commit()
 
-    def __create_table(self, name: str, schema: str):
+        self.journal = GradeJournal(db, SqliteHandle.UPDATE_REPETITION, wal=wal)
+
+    def __create_table(self, name: str, schema: str, without_rowid: bool = False):
         """
         Create a table only if it doesn't exist
         """
-        self.cursor.execute(f"CREATE TABLE IF NOT EXISTS '{name}' ({schema});")
+        options = " WITHOUT ROWID" if without_rowid else ""
+        self.cursor.execute(f"CREATE TABLE IF NOT EXISTS '{name}' ({schema}){options};")
 
-    def __recreate_table(self, name: str, schema: str):
+    def __add_column(self, table: str, column: str, column_type: str):
         """
-        Recreate a table even if it exists
+        Add a column to a table created by an older version if it is missing.
         """
-        self.__drop_table(name)
-        self.cursor.execute(f"CREATE TABLE '{name}' ({schema});")
+        res = self.cursor.execute(f"PRAGMA table_info({table});")
+        if column not in [info[1] for info in res.fetchall()]:
+            self.cursor.execute(
+                f"ALTER TABLE '{table}' ADD COLUMN {column} {column_type};"
+            )
 
-    def __drop_table(self, name: str):
+    def __create_index(self, name: str, table: str, columns: str):
         """
-        Drop table.
+        Create an index only if it doesn't exist
         """
-        res = self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        if (name,) in res.fetchall():
-            self.cursor.execute(f"DROP TABLE '{name}';")
+        self.cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS '{name}' ON '{table}' ({columns});"
+        )
 
-    def get_id_from_file_name(self, file_name: str) -> int | None:
+    def __migrate(self) -> bool:
         """
-        Checks whether the flashcard set already exists.
+        Migrate a database created by an older version to the current schema.
+        Returns whether stored charts were rewritten.
         """
-        table_name = SqliteHandle.FLASHCARDS_TABLE_NAME
+        res = self.cursor.execute("PRAGMA user_version;")
+        version = res.fetchone()[0]
+        rewritten = False
+        if version < 1:
+            rewritten |= self.__migrate_chart_tables()
+        if version < 2:
+            rewritten |= self.__migrate_chart_cells()
+        if version < 3:
+            self.__count_string_refs()
+        if version < 4:
+            # The index is created before migrating so it may still have the
+            # columns of an older version.
+            self.cursor.execute(
+                f"DROP INDEX IF EXISTS {SqliteHandle.WORD_DUE_INDEX_NAME};"
+            )
+            self.__create_index(
+                SqliteHandle.WORD_DUE_INDEX_NAME,
+                SqliteHandle.WORD_TABLE_NAME,
+                SqliteHandle.WORD_DUE_INDEX_COLUMNS,
+            )
+        self.cursor.execute(f"PRAGMA user_version = {SqliteHandle.SCHEMA_VERSION};")
+        return rewritten
+
+    def __migrate_chart_tables(self) -> bool:
+        """
+        Move charts stored in one table per chart into the charts table.
+        """
+        res = self.cursor.execute(f"PRAGMA table_info({SqliteHandle.WORD_TABLE_NAME});")
+        if "table_uuids" not in [column[1] for column in res.fetchall()]:
+            return False
+
         res = self.cursor.execute(
-            f"SELECT id FROM {table_name} WHERE file_name = ?", (file_name,)
+            f"SELECT word, table_uuids FROM {SqliteHandle.WORD_TABLE_NAME} "
+            "WHERE table_uuids IS NOT NULL"
         )
-        set_id = res.fetchone()
-        if set_id is not None:
-            set_id = set_id[0]
-        return set_id
+        for word, table_names in res.fetchall():
+            charts = []
+            for name in table_names.split(","):
+                if not self.__table_exists(name):
+                    continue
+                rows = self.cursor.execute(f"SELECT * FROM '{name}';").fetchall()
+                chart = []
+                for row in rows:
+                    # Shorter rows were padded with NULL to the width of the table.
+                    values = list(row)
+                    while values and values[-1] is None:
+                        values.pop()
+                    chart.append(values)
+                charts.append(chart)
+                self.__drop_table(name)
+            self.__set_charts({word: charts})
 
-    #  pylint: disable=too-many-locals
-    def __update_set(
-        self, set_id: int, config: Config, scraped: dict[str, list[list[list[str]]]]
-    ):
+        self.__drop_table("chart_refs")
+        self.cursor.execute(
+            f"UPDATE {SqliteHandle.WORD_TABLE_NAME} SET table_uuids = NULL;"
+        )
+        try:
+            self.cursor.execute(
+                f"ALTER TABLE {SqliteHandle.WORD_TABLE_NAME} DROP COLUMN table_uuids;"
+            )
+        except sqlite3.OperationalError:
+            # Dropping columns requires sqlite 3.35; the column is unused either way.
+            pass
+        return True
+
+    def __migrate_chart_cells(self) -> bool:
         """
-        Update an existing flashcard set.
+        Encode charts stored as one row per cell in chart_cells into payloads.
         """
-        lang = config.get_lang()
+        if not self.__table_exists(SqliteHandle.CHART_CELLS_TABLE_NAME):
+            return False
+
+        # Read through a separate cursor since encoding writes new strings.
+        res = self.conn.execute(
+            "SELECT chart_id, row, value FROM "
+            f"{SqliteHandle.CHART_CELLS_TABLE_NAME} ORDER BY chart_id, row, col"
+        )
+        groups = itertools.groupby(res, key=lambda cell: cell[0])
+        while True:
+            charts = {}
+            for chart_id, cells in itertools.islice(groups, CHUNK_SIZE):
+                chart: list[list[str]] = []
+                for _, row, value in cells:
+                    while len(chart) <= row:
+                        chart.append([])
+                    chart[row].append(value)
+                charts[chart_id] = chart
+            if not charts:
+                break
+            payloads = self.__encode_charts(list(charts.values()))
+            self.cursor.executemany(
+                f"UPDATE {SqliteHandle.CHARTS_TABLE_NAME} SET payload = ? WHERE id = ?",
+                zip(payloads, charts.keys()),
+            )
+        self.__drop_table(SqliteHandle.CHART_CELLS_TABLE_NAME)
+        return True
+
+    def __count_string_refs(self):
+        """
+        Count the charts referring to each shared string and delete the strings no
+        chart refers to. Charts left without a payload by the migration of charts
+        without cells get an empty one.
+        """
+        self.cursor.execute(
+            f"UPDATE {SqliteHandle.CHARTS_TABLE_NAME} SET payload = ? "
+            "WHERE payload IS NULL",
+            (SqliteHandle.EMPTY_CHART,),
+        )
+        refs: Counter[int] = Counter()
+        # Read through a separate cursor to keep the payloads out of memory.
+        res = self.conn.execute(f"SELECT payload FROM {SqliteHandle.CHARTS_TABLE_NAME}")
+        for (payload,) in res:
+            refs.update(SqliteHandle.payload_strings(payload))
         self.cursor.execute(
-            f"UPDATE {SqliteHandle.FLASHCARDS_TABLE_NAME} SET lang = ? WHERE id = ?",
-            (lang, set_id),
+            f"UPDATE {SqliteHandle.STRINGS_TABLE_NAME} SET refcount = 0"
+        )
+        self.cursor.executemany(
+            f"UPDATE {SqliteHandle.STRINGS_TABLE_NAME} SET refcount = ? WHERE id = ?",
+            [(count, string_id) for string_id, count in refs.items()],
+        )
+        self.cursor.execute(
+            f"DELETE FROM {SqliteHandle.STRINGS_TABLE_NAME} WHERE refcount <= 0"
         )
 
-        table_name = SqliteHandle.WORD_TABLE_NAME
+    def __table_exists(self, name: str) -> bool:
+        """
+        Check whether a table exists.
+        """
         res = self.cursor.execute(
-            f"SELECT word FROM {table_name} WHERE flashcard_set_id = ?", (set_id,)
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?;", (name,)
         )
-        current_words = set(map(lambda word: word[0], res.fetchall()))
-        config_word_dct = {entry.get_word(): entry for entry in config}
-        config_words = set(config_word_dct.keys())
+        return res.fetchone() is not None
+
+    def __drop_table(self, name: str):
+        """
+        Drop table.
+        """
+        if self.__table_exists(name):
+            self.cursor.execute(f"DROP TABLE '{name}';")
 
-        words_to_add = config_words - current_words
-        for word in words_to_add:
-            self.__insert_word(set_id, config_word_dct[word], scraped.get(word, None))
+    @staticmethod
+    def chart_hash(chart: list[list[str]]) -> str:
+        """
+        Get the content hash identifying a chart.
+        """
+        return hashlib.sha256(
+            json.dumps(chart, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
 
-        words_to_update = current_words & config_words
-        for word in words_to_update:
-            self.__update_word(config_word_dct[word], scraped.get(word, None))
+    @staticmethod
+    def cell_text(value: Any) -> str:
+        """
+        Get the text of a chart cell. Custom charts may contain numbers and other
+        TOML values, which are stored as text like sqlite does for TEXT columns, and
+        charts migrated from older versions may have empty cells.
+        """
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            return str(int(value))
+        return str(value)
 
-        words_to_delete = current_words - config_words
-        for word in words_to_delete:
-            self.cursor.execute(
-                "DELETE FROM {SqliteHandle.WORD_TABLE_NAME} WHERE word = ?", (word,)
-            )
+    def __intern_strings(self, charts: list[list[list[str]]]) -> dict[str, int]:
+        """
+        Get the IDs of the cells that are shared between charts, adding the cells
+        that are not stored yet and appear in more than one of the charts. Cells
+        unique to a single chart are left out and stored inline.
+        """
+        counts = Counter(
+            value
+            for chart in charts
+            for value in {SqliteHandle.cell_text(v) for row in chart for v in row}
+        )
+        ids: dict[str, int] = {}
+        values = list(counts)
+        for chunk in chunks(values):
             res = self.cursor.execute(
-                f"SELECT table_uuids FROM '{SqliteHandle.WORD_TABLE_NAME}' WHERE word = ?;",
-                (word,),
+                f"SELECT value, id FROM {SqliteHandle.STRINGS_TABLE_NAME} WHERE value IN "
+                f"({', '.join('?' * len(chunk))})",
+                chunk,
             )
-            table_uuids = res.fetchone()
-            if table_uuids is not None:
-                table_uuids_one = table_uuids[0]
-                if table_uuids_one is not None:
-                    for table_uuid in table_uuids_one.split(","):
-                        self.__drop_table(table_uuid)
-
-    #  pylint: disable=too-many-branches
-    #  pylint: disable=too-many-statements
-    def __insert_word(
-        self, set_id: int, entry: Entry, scraped: list[list[list[str]]] | None
-    ):
+            ids.update(res.fetchall())
+        for value in values:
+            if value not in ids and counts[value] > 1:
+                self.cursor.execute(
+                    f"INSERT INTO {SqliteHandle.STRINGS_TABLE_NAME} (value) VALUES(?)",
+                    (value,),
+                )
+                string_id = self.cursor.lastrowid
+                assert string_id is not None
+                ids[value] = string_id
+        return ids
+
+    def __encode_charts(self, charts: list[list[list[str]]]) -> list[bytes]:
         """
-        Insert a new word into the table.
+        Encode charts as zlib compressed JSON where shared cells are replaced by
+        their string ID and adds a reference to the strings from each chart. Every
+        cell is stored as text so only string IDs are stored as numbers.
         """
-        word = entry.get_word()
-        definition = entry.get_definition()
-        gender = entry.get_gender()
-        aspect = entry.get_aspect()
-        usage = entry.get_usage()
-        part_of_speech = entry.get_part_of_speech()
-        charts = entry.get_charts()
-        repetition = entry.get_repetition()
-        easiness_factor = repetition.get_easiness_factor()
-        num_correct = repetition.get_num_correct()
-        in_n_days = repetition.get_in_n_days()
-        date_of_next = repetition.get_date_of_next()
-        review = 1 if repetition.get_review() else 0
-        if charts is None:
-            final_charts = scraped
-        else:
-            final_charts = [charts]
-
-        table_uuids = []
-        if final_charts is not None:
-            for chart in final_charts:
-                table_uuid = str(uuid.uuid4())
-                table_uuids.append(table_uuid)
-                max_len = max(map(len, chart))
-                if max_len > 26:
-                    raise RuntimeError(
-                        "Inflection tables are only only supported up to a column size of 26"
-                    )
-                schema = ", ".join([f"{chr(i + 97)} TEXT" for i in range(0, max_len)])
-                self.__recreate_table(table_uuid, schema)
-                for row in chart:
-                    columns = []
-                    values = []
-                    for j in range(0, max_len):
-                        try:
-                            val = row[j]
-                        except IndexError:
-                            pass
-                        else:
-                            columns.append(chr(j + 97))
-                            values.append(val)
-                    column_names = ", ".join(columns)
-                    value_places = ", ".join(["?" for _ in range(len(values))])
-                    self.cursor.execute(
-                        f"INSERT OR IGNORE INTO '{table_uuid}' ({column_names}) "
-                        f"VALUES({value_places})",
-                        values,
-                    )
-
-        columns = [
-            "word",
-            "definition",
-            "easiness_factor",
-            "num_correct",
-            "in_n_days",
-            "date_of_next",
-            "review",
-            "flashcard_set_id",
+        ids = self.__intern_strings(charts)
+        charts = [
+            [[SqliteHandle.cell_text(value) for value in row] for row in chart]
+            for chart in charts
         ]
-        insert_values: list[Any] = [
-            word,
-            definition,
-            easiness_factor,
-            num_correct,
-            in_n_days,
-            date_of_next,
-            review,
-            set_id,
+        payloads = [
+            zlib.compress(
+                json.dumps(
+                    [[ids.get(value, value) for value in row] for row in chart],
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                ).encode("utf-8")
+            )
+            for chart in charts
         ]
-        if gender is not None:
-            columns.append("gender")
-            insert_values.append(gender)
-        if aspect is not None:
-            columns.append("aspect")
-            insert_values.append(aspect)
-        if usage is not None:
-            columns.append("usage")
-            insert_values.append(usage)
-        if part_of_speech is not None:
-            columns.append("part_of_speech")
-            insert_values.append(part_of_speech)
-        if len(table_uuids) > 0:
-            columns.append("table_uuids")
-            table_uuid_str = ",".join(table_uuids)
-            insert_values.append(table_uuid_str)
-        column_names = ", ".join(columns)
-        value_places = ", ".join(["?" for _ in range(len(insert_values))])
-        self.cursor.execute(
-            f"INSERT OR IGNORE INTO words ({column_names}) VALUES({value_places})",
-            insert_values,
+        refs: Counter[int] = Counter()
+        for chart in charts:
+            refs.update({ids[v] for row in chart for v in row if v in ids})
+        self.cursor.executemany(
+            f"UPDATE {SqliteHandle.STRINGS_TABLE_NAME} SET refcount = refcount + ? "
+            "WHERE id = ?",
+            [(count, string_id) for string_id, count in refs.items()],
         )
+        return payloads
 
-    #  pylint: disable=too-many-branches
-    def __update_word(self, entry: Entry, scraped: list[list[list[str]]] | None):
+    @staticmethod
+    def payload_strings(payload: bytes | None) -> set[int]:
         """
-        Update existing word in the table.
+        Get the IDs of the shared strings a chart payload refers to.
         """
-        word = entry.get_word()
-        definition = entry.get_definition()
-        gender = entry.get_gender()
-        aspect = entry.get_aspect()
-        usage = entry.get_usage()
-        part_of_speech = entry.get_part_of_speech()
-        charts = entry.get_charts()
-        if charts is None:
-            final_charts = scraped
-        else:
-            final_charts = [charts]
+        if payload is None:
+            return set()
+        return {
+            value
+            for row in json.loads(zlib.decompress(payload))
+            for value in row
+            if isinstance(value, int)
+        }
 
+    def __release_strings(self, refs: Counter[int]):
+        """
+        Drop references to shared strings, deleting strings that are no longer
+        referenced.
+        """
+        if not refs:
+            return
+        self.cursor.executemany(
+            f"UPDATE {SqliteHandle.STRINGS_TABLE_NAME} SET refcount = refcount - ? "
+            "WHERE id = ?",
+            [(count, string_id) for string_id, count in refs.items()],
+        )
         res = self.cursor.execute(
-            f"SELECT table_uuids FROM '{SqliteHandle.WORD_TABLE_NAME}' where word = ?",
-            (word,),
+            f"SELECT id FROM {SqliteHandle.STRINGS_TABLE_NAME} WHERE refcount <= 0"
+        )
+        for (string_id,) in res.fetchall():
+            # IDs of deleted strings may be given to new strings.
+            self.strings.pop(string_id, None)
+        self.cursor.execute(
+            f"DELETE FROM {SqliteHandle.STRINGS_TABLE_NAME} WHERE refcount <= 0"
         )
-        table_uuids = res.fetchone()
-        if table_uuids is not None:
-            table_uuids_one = table_uuids[0]
-            if table_uuids_one is not None:
-                for table_uuid in table_uuids_one.split(","):
-                    self.__drop_table(table_uuid)
-
-        table_uuids = []
-        if final_charts is not None:
-            table_uuids = []
-            for chart in final_charts:
-                table_uuid = str(uuid.uuid4())
-                table_uuids.append(table_uuid)
-                max_len = max(map(len, chart))
-                if max_len > 26:
-                    raise RuntimeError(
-                        "Inflection tables are only only supported up to a column size of 26"
-                    )
-                schema = ", ".join([f"{chr(i + 97)} TEXT" for i in range(0, max_len)])
-                self.__recreate_table(table_uuid, schema)
-                for row in chart:
-                    columns = []
-                    values = []
-                    for j in range(0, max_len):
-                        try:
-                            val = row[j]
-                        except IndexError:
-                            pass
-                        else:
-                            columns.append(chr(j + 97))
-                            values.append(val)
-                    column_names = ", ".join(columns)
-                    value_places = ", ".join(["?" for _ in range(len(values))])
-                    self.cursor.execute(
-                        f"INSERT OR IGNORE INTO '{table_uuid}' ({column_names}) "
-                        f"VALUES({value_places})",
-                        values,
-                    )
 
-        set_statements = [
-            "word = ?",
-            "definition = ?",
+    def __decode_charts(self, payloads: list[bytes]) -> list[list[list[str]]]:
+        """
+        Decode chart payloads, loading the shared cells that are not in memory.
+        """
+        encoded = [
+            [] if payload is None else json.loads(zlib.decompress(payload))
+            for payload in payloads
         ]
-        args = [
-            word,
-            definition,
+        missing = {
+            value
+            for chart in encoded
+            for row in chart
+            for value in row
+            if isinstance(value, int) and value not in self.strings
+        }
+        for chunk in chunks(list(missing)):
+            res = self.cursor.execute(
+                f"SELECT id, value FROM {SqliteHandle.STRINGS_TABLE_NAME} WHERE id IN "
+                f"({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            self.strings.update(res.fetchall())
+        return [
+            [
+                [
+                    self.strings[value] if isinstance(value, int) else value
+                    for value in row
+                ]
+                for row in chart
+            ]
+            for chart in encoded
         ]
-        if gender is not None:
-            set_statements.append("gender = ?")
-            args.append(gender)
-        if aspect is not None:
-            set_statements.append("aspect = ?")
-            args.append(aspect)
-        if usage is not None:
-            set_statements.append("usage = ?")
-            args.append(usage)
-        if part_of_speech is not None:
-            set_statements.append("part_of_speech = ?")
-            args.append(part_of_speech)
-        if len(table_uuids) > 0:
-            table_uuid_str = ",".join(table_uuids)
-            set_statements.append("table_uuids = ?")
-            args.append(table_uuid_str)
-
-        all_set_statements = ", ".join(set_statements)
-        self.cursor.execute(
-            f"UPDATE {SqliteHandle.WORD_TABLE_NAME} SET {all_set_statements} WHERE word = ?",
-            args + [word],
+
+    @staticmethod
+    def entry_hash(entry: Entry) -> str:
+        """
+        Get the content hash of the fields of an entry that are stored on import.
+        """
+        return hashlib.sha256(
+            json.dumps(
+                [
+                    entry.get_word(),
+                    entry.get_definition(),
+                    entry.get_gender(),
+                    entry.get_aspect(),
+                    entry.get_usage(),
+                    entry.get_part_of_speech(),
+                    entry.get_charts(),
+                ],
+                ensure_ascii=False,
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def __chart_hashes(self, words: list[str]) -> dict[str, list[str]]:
+        """
+        Get the hashes of the charts currently stored for each word in order.
+        """
+        hashes: dict[str, list[str]] = {}
+        for chunk in chunks(words):
+            res = self.cursor.execute(
+                f"SELECT word, hash FROM {SqliteHandle.WORD_CHARTS_TABLE_NAME} JOIN "
+                f"{SqliteHandle.CHARTS_TABLE_NAME} ON chart_id = id WHERE word IN "
+                f"({', '.join('?' * len(chunk))}) ORDER BY word, position",
+                chunk,
+            )
+            for word, chart_hash in res:
+                hashes.setdefault(word, []).append(chart_hash)
+        return hashes
+
+    def __store_charts(
+        self, charts: dict[str, list[list[str]]], refs: Counter[str]
+    ) -> dict[str, int]:
+        """
+        Store charts keyed by hash, reusing identical charts that are already stored,
+        and add the given number of references to each. Returns the ID of each chart.
+        """
+        chart_ids: dict[str, int] = {}
+        for chunk in chunks(list(charts)):
+            res = self.cursor.execute(
+                f"SELECT hash, id FROM {SqliteHandle.CHARTS_TABLE_NAME} WHERE hash IN "
+                f"({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            chart_ids.update(res.fetchall())
+
+        new_hashes = [
+            chart_hash for chart_hash in charts if chart_hash not in chart_ids
+        ]
+        payloads = self.__encode_charts(
+            [charts[chart_hash] for chart_hash in new_hashes]
+        )
+        for chart_hash, payload in zip(new_hashes, payloads):
+            self.cursor.execute(SqliteHandle.INSERT_CHART, (chart_hash, payload))
+            chart_id = self.cursor.lastrowid
+            assert chart_id is not None
+            chart_ids[chart_hash] = chart_id
+        self.cursor.executemany(
+            f"UPDATE {SqliteHandle.CHARTS_TABLE_NAME} SET refcount = refcount + ? "
+            "WHERE id = ?",
+            [(count, chart_ids[chart_hash]) for chart_hash, count in refs.items()],
         )
+        return chart_ids
 
-    def __create_new_set(
-        self, file_name: str, config: Config, scraped: dict[str, list[list[list[str]]]]
-    ):
+    def __release_charts(self, words: list[str]):
         """
-        Create a new flashcard set.
+        Drop the references of words to their charts, deleting charts that are no
+        longer referenced.
         """
-        lang = config.get_lang()
-        columns = ["file_name"]
-        values = [file_name]
-        if lang is not None:
-            columns.append("lang")
-            values.append(lang)
-        column_names = ", ".join(columns)
-        value_places = ", ".join(["?" for _ in range(len(values))])
+        for word in words:
+            self.chart_cache.pop(word, None)
+        refs: Counter[int] = Counter()
+        for chunk in chunks(words):
+            res = self.cursor.execute(
+                f"SELECT chart_id FROM {SqliteHandle.WORD_CHARTS_TABLE_NAME} WHERE "
+                f"word IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            refs.update(chart_id for (chart_id,) in res)
+        if not refs:
+            return
+
+        self.cursor.executemany(
+            f"UPDATE {SqliteHandle.CHARTS_TABLE_NAME} SET refcount = refcount - ? "
+            "WHERE id = ?",
+            [(count, chart_id) for chart_id, count in refs.items()],
+        )
+        self.cursor.executemany(
+            f"DELETE FROM {SqliteHandle.WORD_CHARTS_TABLE_NAME} WHERE word = ?",
+            [(word,) for word in words],
+        )
+        res = self.cursor.execute(
+            f"SELECT payload FROM {SqliteHandle.CHARTS_TABLE_NAME} WHERE refcount <= 0"
+        )
+        strings: Counter[int] = Counter()
+        for (payload,) in res.fetchall():
+            strings.update(SqliteHandle.payload_strings(payload))
         self.cursor.execute(
-            f"INSERT INTO flashcard_sets ({column_names}) VALUES({value_places})",
-            values,
+            f"DELETE FROM {SqliteHandle.CHARTS_TABLE_NAME} WHERE refcount <= 0"
         )
-        set_id = self.cursor.lastrowid
-        self.__create_table(
-            SqliteHandle.WORD_TABLE_NAME,
-            SqliteHandle.WORD_SCHEMA,
+        self.__release_strings(strings)
+
+    def __set_charts(self, all_charts: dict[str, list[list[list[str]]]]) -> list[str]:
+        """
+        Replace the charts of existing words. Words whose charts are unchanged are
+        left alone along with the references to their charts. Returns the words whose
+        charts changed.
+        """
+        current = self.__chart_hashes(list(all_charts))
+        hashed = {
+            word: [SqliteHandle.chart_hash(chart) for chart in charts]
+            for word, charts in all_charts.items()
+        }
+        changed = [word for word in all_charts if current.get(word, []) != hashed[word]]
+        if not changed:
+            return changed
+
+        self.__release_charts(changed)
+        charts = {}
+        refs: Counter[str] = Counter()
+        for word in changed:
+            for chart_hash, chart in zip(hashed[word], all_charts[word]):
+                charts[chart_hash] = chart
+                refs[chart_hash] += 1
+        chart_ids = self.__store_charts(charts, refs)
+        self.cursor.executemany(
+            SqliteHandle.INSERT_WORD_CHART,
+            [
+                (word, position, chart_ids[chart_hash])
+                for word in changed
+                for position, chart_hash in enumerate(hashed[word])
+            ],
+        )
+        return changed
+
+    def __unindex_words(self, words: list[str]):
+        """
+        Remove words from the search index.
+        """
+        if not self.search_enabled:
+            return
+        for chunk in chunks(words):
+            self.cursor.execute(
+                f"DELETE FROM {SqliteHandle.SEARCH_TABLE_NAME} WHERE rowid IN "
+                f"(SELECT rowid FROM {SqliteHandle.WORD_TABLE_NAME} WHERE word IN "
+                f"({', '.join('?' * len(chunk))}))",
+                chunk,
+            )
+
+    def __index_words(
+        self,
+        words: list[str],
+        known_charts: dict[str, list[list[list[str]]]] | None = None,
+    ):
+        """
+        Update the search index entries of words from their stored fields and the
+        cells of their charts. Charts that were just stored can be passed in to
+        avoid decoding them again.
+        """
+        if not self.search_enabled:
+            return
+        if known_charts is None:
+            known_charts = {}
+        self.__unindex_words(words)
+        for chunk in chunks(words):
+            placeholders = ", ".join("?" * len(chunk))
+            forms: dict[str, set[str]] = {}
+            for word in chunk:
+                for chart in known_charts.get(word, []):
+                    forms.setdefault(word, set()).update(
+                        SqliteHandle.cell_text(value) for row in chart for value in row
+                    )
+            unknown = [word for word in chunk if word not in known_charts]
+            res = self.cursor.execute(
+                f"SELECT word, payload FROM {SqliteHandle.WORD_CHARTS_TABLE_NAME} "
+                f"JOIN {SqliteHandle.CHARTS_TABLE_NAME} ON chart_id = id "
+                f"WHERE word IN ({', '.join('?' * len(unknown))})",
+                unknown,
+            )
+            payloads = res.fetchall()
+            for (word, _), chart in zip(
+                payloads, self.__decode_charts([payload for _, payload in payloads])
+            ):
+                forms.setdefault(word, set()).update(
+                    value for row in chart for value in row if value
+                )
+
+            res = self.cursor.execute(
+                f"SELECT rowid, word, definition, usage FROM "
+                f"{SqliteHandle.WORD_TABLE_NAME} WHERE word IN ({placeholders})",
+                chunk,
+            )
+            self.cursor.executemany(
+                f"INSERT INTO {SqliteHandle.SEARCH_TABLE_NAME} (rowid, word, "
+                "definition, usage, forms) VALUES(?, ?, ?, ?, ?)",
+                [
+                    (rowid, word, definition, usage, " ".join(forms.get(word, [])))
+                    for rowid, word, definition, usage in res.fetchall()
+                ],
+            )
+
+    def __rebuild_search(self):
+        """
+        Index all words from scratch.
+        """
+        self.cursor.execute(f"DELETE FROM {SqliteHandle.SEARCH_TABLE_NAME};")
+        res = self.cursor.execute(f"SELECT word FROM {SqliteHandle.WORD_TABLE_NAME}")
+        self.__index_words([word for (word,) in res.fetchall()])
+
+    def get_id_from_file_name(self, file_name: str) -> int | None:
+        """
+        Checks whether the flashcard set already exists.
+        """
+        table_name = SqliteHandle.FLASHCARDS_TABLE_NAME
+        res = self.cursor.execute(
+            f"SELECT id FROM {table_name} WHERE file_name = ?", (file_name,)
         )
+        set_id = res.fetchone()
         if set_id is not None:
-            for entry in iter(config):
-                self.__insert_word(set_id, entry, scraped.get(entry.get_word(), None))
+            set_id = set_id[0]
+        return set_id
+
+    def get_charted_words(self, file_name: str) -> set[str]:
+        """
+        Get all words in a flashcard set that already have charts stored or that were
+        scraped without finding any charts.
+        """
+        res = self.cursor.execute(
+            f"SELECT word FROM {SqliteHandle.WORD_TABLE_NAME} WHERE flashcard_set_id "
+            f"IN (SELECT id FROM {SqliteHandle.FLASHCARDS_TABLE_NAME} WHERE "
+            "file_name = ?) AND (scraped = 1 OR word IN (SELECT word FROM "
+            f"{SqliteHandle.WORD_CHARTS_TABLE_NAME}))",
+            (file_name,),
+        )
+        return {word for (word,) in res.fetchall()}
+
+    def __mark_scraped(self, words: list[str]):
+        """
+        Record that words were scraped, even if no charts were found for them, so
+        they are not scraped again unless they are marked as stale.
+        """
+        self.cursor.executemany(
+            f"UPDATE {SqliteHandle.WORD_TABLE_NAME} SET scraped = 1 WHERE word = ?",
+            [(word,) for word in words],
+        )
+
+    @staticmethod
+    def __final_charts(
+        entry: Entry, scraped: dict[str, list[list[list[str]]]]
+    ) -> list[list[list[str]]] | None:
+        """
+        Get the charts to store for an entry; custom charts take precedence over
+        scraped charts. None means the stored charts should be kept.
+        """
+        charts = entry.get_charts()
+        if charts is None:
+            return scraped.get(entry.get_word(), None)
+        return [charts]
 
-    #  pylint: disable=too-many-nested-blocks
-    #  pylint: disable=too-many-statements
-    #  pylint: disable=too-many-branches
     #  pylint: disable=too-many-locals
+    def __import_words(
+        self,
+        set_id: int,
+        config: Config,
+        scraped: dict[str, list[list[list[str]]]],
+    ):
+        """
+        Insert new words and update changed words of a flashcard set in bulk,
+        deleting words that are no longer part of the set. Words whose entry hash
+        matches the stored one are left alone.
+        """
+        table_name = SqliteHandle.WORD_TABLE_NAME
+        res = self.cursor.execute(
+            f"SELECT word, entry_hash FROM {table_name} WHERE flashcard_set_id = ?",
+            (set_id,),
+        )
+        current_words = dict(res.fetchall())
+        config_word_dct = {entry.get_word(): entry for entry in config}
+
+        to_insert = []
+        to_update = []
+        hashes = {}
+        for word, entry in config_word_dct.items():
+            hashes[word] = SqliteHandle.entry_hash(entry)
+            if word not in current_words:
+                to_insert.append(entry)
+            elif current_words[word] != hashes[word]:
+                to_update.append(entry)
+
+        self.cursor.executemany(
+            SqliteHandle.INSERT_WORD,
+            [
+                (
+                    entry.get_word(),
+                    entry.get_definition(),
+                    entry.get_gender(),
+                    entry.get_aspect(),
+                    entry.get_usage(),
+                    entry.get_part_of_speech(),
+                    entry.get_repetition().get_easiness_factor(),
+                    entry.get_repetition().get_num_correct(),
+                    entry.get_repetition().get_in_n_days(),
+                    str(entry.get_repetition().get_date_of_next()),
+                    1 if entry.get_repetition().get_review() else 0,
+                    set_id,
+                    hashes[entry.get_word()],
+                )
+                for entry in to_insert
+            ],
+        )
+        self.cursor.executemany(
+            SqliteHandle.UPDATE_WORD,
+            [
+                (
+                    entry.get_definition(),
+                    entry.get_gender(),
+                    entry.get_aspect(),
+                    entry.get_usage(),
+                    entry.get_part_of_speech(),
+                    hashes[entry.get_word()],
+                    entry.get_word(),
+                )
+                for entry in to_update
+            ],
+        )
+
+        words_to_delete = list(current_words.keys() - config_word_dct.keys())
+        self.__unindex_words(words_to_delete)
+        self.__release_charts(words_to_delete)
+        self.cursor.executemany(
+            f"DELETE FROM {table_name} WHERE word = ?",
+            [(word,) for word in words_to_delete],
+        )
+
+        # Words that already exist in another set are ignored on insert so only
+        # touch the charts of words that belong to this set.
+        res = self.cursor.execute(
+            f"SELECT word FROM {table_name} WHERE flashcard_set_id = ?", (set_id,)
+        )
+        set_words = {word for (word,) in res.fetchall()}
+        changed = {entry.get_word() for entry in to_insert + to_update}
+        all_charts = {}
+        for entry in config:
+            if entry.get_word() not in changed and entry.get_word() not in scraped:
+                continue
+            final_charts = SqliteHandle.__final_charts(entry, scraped)
+            if final_charts is not None and entry.get_word() in set_words:
+                all_charts[entry.get_word()] = final_charts
+        charts_changed = self.__set_charts(all_charts)
+        self.__index_words(list(changed & set_words | set(charts_changed)), all_charts)
+        self.__mark_scraped(list(scraped.keys() & set_words))
+
+    def store_charts(
+        self, file_name: str, scraped: dict[str, list[list[list[str]]]]
+    ) -> int:
+        """
+        Store scraped charts for words of a flashcard set that have already been
+        imported and commit them. Words that belong to another set keep their charts.
+        Returns the number of words whose charts were stored.
+        """
+        with self.conn:
+            words = list(scraped)
+            existing: set[str] = set()
+            for chunk in chunks(words):
+                res = self.cursor.execute(
+                    f"SELECT word FROM {SqliteHandle.WORD_TABLE_NAME} WHERE "
+                    "flashcard_set_id = (SELECT id FROM "
+                    f"{SqliteHandle.FLASHCARDS_TABLE_NAME} WHERE file_name = ?) AND "
+                    f"word IN ({', '.join('?' * len(chunk))})",
+                    [file_name, *chunk],
+                )
+                existing.update(word for (word,) in res)
+            all_charts = {
+                word: charts for word, charts in scraped.items() if word in existing
+            }
+            self.__index_words(self.__set_charts(all_charts), all_charts)
+            self.__mark_scraped(list(existing))
+        return len(existing)
+
     def import_set(
         self, file_name: str, config: Config, scraped: dict[str, list[list[list[str]]]]
     ) -> bool:
         """
-        Import set into database.
+        Import set into database in a single transaction. Nothing is written if the
+        file is unchanged since the last import and there are no scraped charts.
         """
-        set_id = self.get_id_from_file_name(file_name)
-        if set_id is None:
-            self.__create_new_set(file_name, config, scraped)
-            self.conn.commit()
-            return True
+        with self.conn:
+            res = self.cursor.execute(
+                f"SELECT id, file_hash FROM {SqliteHandle.FLASHCARDS_TABLE_NAME} "
+                "WHERE file_name = ?",
+                (file_name,),
+            )
+            row = res.fetchone()
+            if row is None:
+                self.cursor.execute(
+                    f"INSERT INTO {SqliteHandle.FLASHCARDS_TABLE_NAME} (file_name, lang, "
+                    "file_hash) VALUES(?, ?, ?)",
+                    (file_name, config.get_lang(), config.get_hash()),
+                )
+                set_id = self.cursor.lastrowid
+                assert set_id is not None
+                self.__import_words(set_id, config, scraped)
+                return True
 
-        self.__update_set(set_id, config, scraped)
-        self.conn.commit()
+            (set_id, file_hash) = row
+            if file_hash is not None and file_hash == config.get_hash() and not scraped:
+                return False
+            self.cursor.execute(
+                f"UPDATE {SqliteHandle.FLASHCARDS_TABLE_NAME} SET lang = ?, "
+                "file_hash = ? WHERE id = ?",
+                (config.get_lang(), config.get_hash(), set_id),
+            )
+            self.__import_words(set_id, config, scraped)
         return False
 
     def delete_set(self, set_id: int):
@@ -357,14 +1011,13 @@ class SqliteHandle:
         Delete a set from the database.
         """
         res = self.cursor.execute(
-            f"SELECT table_uuids FROM '{SqliteHandle.WORD_TABLE_NAME}' WHERE "
+            f"SELECT word FROM '{SqliteHandle.WORD_TABLE_NAME}' WHERE "
             "flashcard_set_id = ?",
             (set_id,),
         )
-        for uuids in res:
-            if uuids[0] is not None:
-                for table_uuid in uuids[0].split(","):
-                    self.__drop_table(table_uuid)
+        words = [word for (word,) in res.fetchall()]
+        self.__unindex_words(words)
+        self.__release_charts(words)
         self.cursor.execute(
             f"DELETE FROM {SqliteHandle.WORD_TABLE_NAME} WHERE flashcard_set_id = ?",
             (set_id,),
@@ -376,86 +1029,120 @@ class SqliteHandle:
 
     def load_config(self, file_name: str) -> Config:
         """
-        Load config from database.
+        Load the words of a set that are due for study from database.
         """
-        set_id = self.get_id_from_file_name(file_name)
+        self.journal.flush()
         res = self.cursor.execute(
-            "SELECT lang FROM flashcard_sets WHERE file_name = ?", (file_name,)
+            f"SELECT id, lang FROM {SqliteHandle.FLASHCARDS_TABLE_NAME} "
+            "WHERE file_name = ?",
+            (file_name,),
         )
-        lang = res.fetchall()[0]
+        row = res.fetchone()
+        if row is None:
+            raise RuntimeError(f"Flashcard set {file_name} not found")
+        set_id, lang = row
+        params = {"set_id": set_id, "today": str(date.today())}
 
         res = self.cursor.execute(
-            "SELECT word, definition, gender, aspect, usage, part_of_speech, "
-            "easiness_factor, num_correct, in_n_days, date_of_next, review, "
-            "table_uuids FROM 'words' WHERE flashcard_set_id = ?",
-            (set_id,),
+            SqliteHandle.DUE_WORDS.format(
+                columns="word, definition, gender, aspect, usage, part_of_speech, "
+                "easiness_factor, num_correct, in_n_days, date_of_next, review"
+            ),
+            params,
         )
-        entries = res.fetchall()
 
+        # Dates and the few distinct genders, aspects and parts of speech repeat
+        # across the set so every entry refers to a single copy of each value.
+        shared: dict[Any, Any] = {}
+        dates: dict[str, date] = {}
+        load_charts = self.load_charts
         loaded_entries = []
-        for entry in entries:
-            (
-                word,
-                definition,
-                gender,
-                aspect,
-                usage,
-                part_of_speech,
-                easiness_factor,
-                num_correct,
-                in_n_days,
-                date_of_next,
-                review,
-                table_uuids,
-            ) = entry
-            date_of_next = date.fromisoformat(date_of_next)
-            review = review != 0
-
-            charts = []
-            if table_uuids is not None:
-                for name in table_uuids.split(","):
-                    res = self.cursor.execute(f"SELECT * FROM '{name}';")
-                    chart = res.fetchall()
-                    charts.append(chart)
-
-            if date.today() >= date_of_next or review:
-                loaded_entries.append(
-                    Entry(
-                        word,
-                        definition,
-                        gender,
-                        aspect,
-                        usage,
-                        part_of_speech,
-                        charts,
-                        WordRepetition(
-                            easiness_factor,
-                            num_correct,
-                            in_n_days,
-                            date_of_next,
-                            review,
-                        ),
-                    )
+        for (
+            word,
+            definition,
+            gender,
+            aspect,
+            usage,
+            part_of_speech,
+            easiness_factor,
+            num_correct,
+            in_n_days,
+            date_of_next,
+            review,
+        ) in res.fetchall():
+            next_date = dates.get(date_of_next)
+            if next_date is None:
+                next_date = dates[date_of_next] = date.fromisoformat(date_of_next)
+            loaded_entries.append(
+                Entry(
+                    word,
+                    definition,
+                    shared.setdefault(gender, gender),
+                    shared.setdefault(aspect, aspect),
+                    usage,
+                    shared.setdefault(part_of_speech, part_of_speech),
+                    load_charts,
+                    WordRepetition(
+                        easiness_factor,
+                        num_correct,
+                        in_n_days,
+                        next_date,
+                        review != 0,
+                    ),
                 )
+            )
 
         return Config(lang, loaded_entries)
 
+    def load_charts(self, word: str) -> list[Any]:
+        """
+        Load the charts of a word, keeping the most recently loaded charts in memory.
+        """
+        charts = self.chart_cache.get(word, None)
+        if charts is not None:
+            self.chart_cache.move_to_end(word)
+            return charts
+
+        res = self.cursor.execute(
+            f"SELECT payload FROM {SqliteHandle.WORD_CHARTS_TABLE_NAME} JOIN "
+            f"{SqliteHandle.CHARTS_TABLE_NAME} ON chart_id = id WHERE word = ? "
+            "ORDER BY position",
+            (word,),
+        )
+        charts = self.__decode_charts([payload for (payload,) in res.fetchall()])
+
+        self.chart_cache[word] = charts
+        if len(self.chart_cache) > self.chart_cache_size:
+            self.chart_cache.popitem(last=False)
+        return charts
+
     def update_config(self, word: str, repetition: WordRepetition):
         """
-        Update config for word.
+        Update config for word. The update is written to disk in the background.
         """
-        easiness_factor = repetition.get_easiness_factor()
-        num_correct = repetition.get_num_correct()
-        in_n_days = repetition.get_in_n_days()
-        date_of_next = str(repetition.get_date_of_next())
-        review = 1 if repetition.get_review() else 0
-        self.cursor.execute(
-            f"UPDATE {SqliteHandle.WORD_TABLE_NAME} SET easiness_factor = ?, "
-            "num_correct = ?, in_n_days = ?, date_of_next = ?, review = ? "
-            "WHERE word = ?",
-            (easiness_factor, num_correct, in_n_days, date_of_next, review, word),
+        self.journal.record(
+            word,
+            (
+                repetition.get_easiness_factor(),
+                repetition.get_num_correct(),
+                repetition.get_in_n_days(),
+                str(repetition.get_date_of_next()),
+                1 if repetition.get_review() else 0,
+                word,
+            ),
         )
-        self.conn.commit()
+
+    def flush_grades(self, wait: bool = True):
+        """
+        Write all grades that are still pending to disk.
+        """
+        self.journal.flush(wait)
+
+    def pause_grades(self, paused: bool):
+        """
+        Hold grades in memory instead of writing them in the background.
+        """
+        self.journal.set_paused(paused)
 
     def get_all_sets(self) -> list[str]:
         """
@@ -464,10 +1151,56 @@ class SqliteHandle:
         res = self.cursor.execute("SELECT file_name FROM flashcard_sets;")
         return [entry[0] for entry in res.fetchall()]
 
+    def get_set_summaries(self) -> list[SetSummary]:
+        """
+        Get the number of due, review, new and total words of all flashcard sets
+        without loading any words.
+        """
+        self.journal.flush()
+        res = self.cursor.execute(
+            "SELECT file_name, "
+            "COALESCE(SUM(review = 0 AND date_of_next <= ?), 0), "
+            "COALESCE(SUM(review = 1), 0), COALESCE(SUM(in_n_days = 0), 0), "
+            f"COUNT(flashcard_set_id) FROM {SqliteHandle.FLASHCARDS_TABLE_NAME} "
+            f"LEFT JOIN {SqliteHandle.WORD_TABLE_NAME} ON flashcard_set_id = id "
+            "GROUP BY id ORDER BY id",
+            (str(date.today()),),
+        )
+        return [SetSummary(*row) for row in res.fetchall()]
+
+    def search(self, text: str, limit: int = SEARCH_LIMIT) -> list[SearchResult]:
+        """
+        Find words whose word, definition, usage or chart cells contain words
+        starting with each of the search terms, best matches first.
+        """
+        if not self.search_enabled:
+            raise RuntimeError("Searching requires sqlite to be built with FTS5")
+        terms = " ".join('"' + term.replace('"', '""') + '"*' for term in text.split())
+        if not terms:
+            return []
+        # Ranking every match is slow for common prefixes so matches on the word
+        # itself are listed before all other matches instead, both in index order.
+        results: dict[str, SearchResult] = {}
+        for query in [f"word : ({terms})", terms]:
+            res = self.cursor.execute(
+                "SELECT words.word, words.definition, file_name FROM "
+                f"(SELECT rowid FROM {SqliteHandle.SEARCH_TABLE_NAME} WHERE "
+                f"{SqliteHandle.SEARCH_TABLE_NAME} MATCH ? LIMIT ?) AS found "
+                f"JOIN {SqliteHandle.WORD_TABLE_NAME} ON words.rowid = found.rowid "
+                f"JOIN {SqliteHandle.FLASHCARDS_TABLE_NAME} "
+                "ON flashcard_sets.id = flashcard_set_id",
+                (query, limit),
+            )
+            for word, definition, file_name in res.fetchall():
+                if word not in results and len(results) < limit:
+                    results[word] = SearchResult(word, definition, file_name)
+        return list(results.values())
+
     def close(self):
         """
         Close connection to database.
         """
+        self.journal.close()
         self.conn.commit()
         self.cursor.close()
         self.conn.close()
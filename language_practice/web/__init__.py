@@ -3,57 +3,291 @@ Handles web scraping.
 """
 
 import asyncio
+import contextlib
+import functools
+from concurrent.futures import Executor
+from typing import AsyncIterator, Awaitable, Callable
 
 import aiohttp
-from bs4 import BeautifulSoup
 
 from language_practice.config import Entry
-from language_practice.web import fr, ru, uk
+from language_practice.progress import ImportProgress
+from language_practice.web.api import API_URL, PageRevision, render, resolve
+from language_practice.web.cache import ResponseCache, normalize_title
+from language_practice.web.offline import OfflineStore
+from language_practice.web.parse import parse_page
+from language_practice.web.scheduler import Scheduler, check_retryable
+from language_practice.web.session import SessionManager
 
 URL = "https://en.wiktionary.org/wiki/"
 
+# Maximum number of words in flight while scraping.
+WINDOW = 100
 
+
+async def download(
+    session: aiohttp.ClientSession, title: str, cache: ResponseCache | None
+) -> str | None:
+    """
+    Download the page for a title, consulting the response cache first if one is
+    provided. Returns None if the page does not exist.
+    """
+    cached = cache.lookup(title) if cache is not None else None
+    if cache is not None and cached is not None and cache.is_fresh(cached):
+        cache.record_hit()
+        return cached.get_body() if cached.get_status() == 200 else None
+
+    headers = cached.get_conditional_headers() if cached is not None else {}
+    async with session.get(URL + title, headers=headers) as response:
+        if cache is not None and cached is not None and response.status == 304:
+            cache.record_revalidated()
+            cache.refresh(title)
+            return cached.get_body() if cached.get_status() == 200 else None
+        if response.status == 404:
+            if cache is not None:
+                cache.record_miss()
+                cache.store(title, 404, "")
+            return None
+        check_retryable(response)
+        text = await response.text()
+        if cache is not None:
+            cache.record_miss()
+            if response.status == 200:
+                cache.store(
+                    title,
+                    200,
+                    text,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                )
+        return text
+
+
+#  pylint: disable=too-many-arguments
+#  pylint: disable=too-many-positional-arguments
+#  pylint: disable=too-many-locals
 async def fetch(
-    session: aiohttp.ClientSession, word: str, lang: str | None
+    session: aiohttp.ClientSession,
+    word: str,
+    lang: str | None,
+    cache: ResponseCache | None = None,
+    scheduler: Scheduler | None = None,
+    pool: Executor | None = None,
+    page: PageRevision | None = None,
+    api_url: str = API_URL,
+    progress: ImportProgress | None = None,
 ) -> tuple[str, list[list[list[str]]]]:
     """
     Fetch individual word asynchronously.
+
+    If a pool is provided, parsing is handed off to it so the event loop is free to
+    keep downloading. If the page was already resolved through the API, its HTML is
+    rendered through the API as well instead of downloading the skinned page.
     """
     if lang is None:
         return (word, [])
 
+    title = normalize_title(word)
+    request: Callable[[], Awaitable[str | None]]
+    if page is None:
+        url = URL + title
+        request = functools.partial(download, session, title, cache)
+    else:
+        url = api_url
+        request = functools.partial(render, session, title, page, cache, api_url)
+
     try:
-        async with session.get(URL + word.replace("\u0301", "")) as response:
-            if response.status == 404:
-                return (word, [])
-            text = await response.text()
-            html = BeautifulSoup(text, "html.parser")
-
-            if lang == "fr":
-                return (word, fr.parse(html))
-            if lang == "ru":
-                return (word, ru.parse(html))
-            if lang == "uk":
-                return (word, uk.parse(html))
-            raise RuntimeError(
-                "Reached a condition that should be unreachable; please file a bug"
-            )
+        if scheduler is None:
+            text = await request()
+        else:
+            text = await scheduler.run(url, request)
+        if progress is not None:
+            progress.record_fetched()
+        if text is None:
+            return (word, [])
+
+        if pool is None:
+            charts = parse_page(text, lang)
+        else:
+            loop = asyncio.get_running_loop()
+            charts = await loop.run_in_executor(pool, parse_page, text, lang)
+        if progress is not None:
+            progress.record_parsed()
+        return (word, charts)
     except Exception as err:
         raise RuntimeError(f"Error fetching word {word}") from err
 
 
+#  pylint: disable=too-many-arguments
+#  pylint: disable=too-many-positional-arguments
+#  pylint: disable=too-many-locals
+#  pylint: disable=too-many-branches
+#  pylint: disable=too-many-statements
+async def scrape_iter(
+    words: list[Entry],
+    lang: str | None,
+    cache: ResponseCache | None = None,
+    scheduler: Scheduler | None = None,
+    pool: Executor | None = None,
+    bulk: bool = False,
+    api_url: str = API_URL,
+    offline: OfflineStore | None = None,
+    stored: set[str] | None = None,
+    progress: ImportProgress | None = None,
+    sessions: SessionManager | None = None,
+) -> AsyncIterator[tuple[str, list[list[list[str]]]]]:
+    """
+    Fetch all words asynchronously, yielding the charts of each word as soon as they
+    have been parsed.
+
+    At most WINDOW words are in flight at a time so memory use does not grow with the
+    number of words. Words that still fail after all retries are recorded in the
+    progress if provided instead of aborting the whole batch. Scraping stops early if
+    cancellation is requested through the progress.
+
+    In bulk mode, titles are first resolved through the MediaWiki API in batches.
+    Missing pages then cost no further requests, cached pages whose revision is
+    unchanged are used without any request and the remaining pages are fetched as
+    unskinned HTML.
+
+    If an offline store is provided, words found in it are resolved without any
+    request.
+
+    Words with custom charts are never scraped. If the words that were already scraped
+    are provided, only words that are missing from it or marked as stale are scraped.
+
+    If a session manager is provided, its shared session is used instead of opening a
+    new one.
+    """
+    if scheduler is None:
+        scheduler = Scheduler()
+    if progress is None:
+        progress = ImportProgress("")
+
+    words = [
+        entry
+        for entry in words
+        if entry.get_charts() is None
+        and (stored is None or entry.get_word() not in stored or entry.get_stale())
+    ]
+    progress.set_total(len(words))
+
+    if offline is not None and lang is not None:
+        remaining = []
+        for entry in words:
+            charts = offline.lookup(lang, entry.get_word())
+            if charts is None:
+                remaining.append(entry)
+            else:
+                progress.record_fetched()
+                progress.record_parsed()
+                yield (entry.get_word(), charts)
+        words = remaining
+        if not words:
+            return
+
+    async def fetch_or_fail(
+        word: str, pages: dict[str, PageRevision | None] | None
+    ) -> tuple[str, list[list[list[str]]]] | None:
+        page = None
+        if pages is not None:
+            title = normalize_title(word)
+            if title not in pages:
+                progress.record_failed(word)
+                return None
+            page = pages[title]
+            if page is None:
+                progress.record_fetched()
+                progress.record_parsed()
+                return (word, [])
+        try:
+            return await fetch(
+                session, word, lang, cache, scheduler, pool, page, api_url, progress
+            )
+        except RuntimeError:
+            progress.record_failed(word)
+            return None
+
+    async with contextlib.AsyncExitStack() as stack:
+        if sessions is None:
+            session = await stack.enter_async_context(
+                aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+            )
+        else:
+            session = await sessions.get_session()
+
+        pages = None
+        if bulk and lang is not None:
+            titles = list({normalize_title(entry.get_word()) for entry in words})
+            pages = await resolve(session, scheduler, titles, api_url)
+
+        entries = iter(words)
+        pending: set[asyncio.Task] = set()
+        try:
+            while not progress.is_cancelled():
+                while len(pending) < WINDOW:
+                    next_entry = next(entries, None)
+                    if next_entry is None:
+                        break
+                    pending.add(
+                        asyncio.create_task(fetch_or_fail(next_entry.get_word(), pages))
+                    )
+                if not pending:
+                    break
+                # Wake up regularly to notice cancellation even if nothing finishes.
+                (done, pending) = await asyncio.wait(
+                    pending, timeout=0.25, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    result = task.result()
+                    if result is not None:
+                        yield result
+        finally:
+            for task in pending:
+                task.cancel()
+            # Wait for the cancelled fetches to unwind so none of them outlives the
+            # session or is destroyed while still pending.
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+#  pylint: disable=too-many-arguments
+#  pylint: disable=too-many-positional-arguments
 async def scrape(
-    words: list[Entry], lang: str | None
+    words: list[Entry],
+    lang: str | None,
+    cache: ResponseCache | None = None,
+    scheduler: Scheduler | None = None,
+    failed: list[str] | None = None,
+    pool: Executor | None = None,
+    bulk: bool = False,
+    api_url: str = API_URL,
+    offline: OfflineStore | None = None,
+    stored: set[str] | None = None,
+    sessions: SessionManager | None = None,
 ) -> dict[str, list[list[list[str]]]]:
     """
     Fetch all words asynchronously.
+
+    Words that still fail after all retries are left out of the result and appended
+    to failed if provided. See scrape_iter for the remaining arguments.
     """
-    async with aiohttp.ClientSession() as session:
-        ret = await asyncio.gather(
-            *[fetch(session, word.get_word(), lang) for word in words]
-        )
-        scraped_info = {}
-        for word, info in ret:
-            scraped_info[word] = info
+    progress = ImportProgress("")
+    scraped_info = {}
+    async for word, info in scrape_iter(
+        words,
+        lang,
+        cache,
+        scheduler,
+        pool,
+        bulk,
+        api_url,
+        offline,
+        stored,
+        progress,
+        sessions,
+    ):
+        scraped_info[word] = info
+    if failed is not None:
+        failed.extend(progress.get_failed())
 
-        return scraped_info
+    return scraped_info
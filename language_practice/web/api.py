@@ -0,0 +1,158 @@
+"""
+Bulk page retrieval through the MediaWiki action API.
+"""
+
+import asyncio
+import functools
+from typing import Any
+
+import aiohttp
+
+from language_practice.web.cache import ResponseCache
+from language_practice.web.scheduler import Scheduler, check_retryable
+
+API_URL = "https://en.wiktionary.org/w/api.php"
+
+# Maximum number of titles the API accepts in a single query for regular clients.
+QUERY_BATCH_SIZE = 50
+
+
+class PageRevision:
+    """
+    The canonical title and latest revision of an existing page.
+    """
+
+    def __init__(self, title: str, revision: int):
+        self.title = title
+        self.revision = revision
+
+    def get_title(self) -> str:
+        """
+        Get canonical title of the page.
+        """
+        return self.title
+
+    def get_revision(self) -> int:
+        """
+        Get latest revision ID of the page.
+        """
+        return self.revision
+
+
+async def call(
+    session: aiohttp.ClientSession, api_url: str, params: dict[str, str]
+) -> dict[str, Any]:
+    """
+    Issue a single API request and return the decoded JSON response.
+    """
+    params = {"format": "json", "formatversion": "2", **params}
+    async with session.get(api_url, params=params) as response:
+        check_retryable(response)
+        response.raise_for_status()
+        data = await response.json()
+        if "error" in data:
+            raise RuntimeError(f"API error: {data['error'].get('info', data['error'])}")
+        return data
+
+
+async def resolve_batch(
+    session: aiohttp.ClientSession, titles: list[str], api_url: str
+) -> dict[str, PageRevision | None]:
+    """
+    Resolve up to QUERY_BATCH_SIZE titles to their canonical title and latest revision
+    in a single request, following redirects. Missing pages resolve to None.
+    """
+    data = await call(
+        session,
+        api_url,
+        {
+            "action": "query",
+            "prop": "info",
+            "redirects": "1",
+            "titles": "|".join(titles),
+        },
+    )
+    query = data.get("query", {})
+    normalized = {entry["from"]: entry["to"] for entry in query.get("normalized", [])}
+    redirects = {entry["from"]: entry["to"] for entry in query.get("redirects", [])}
+    pages = {page["title"]: page for page in query.get("pages", [])}
+
+    resolved: dict[str, PageRevision | None] = {}
+    for title in titles:
+        canonical = normalized.get(title, title)
+        canonical = redirects.get(canonical, canonical)
+        page = pages.get(canonical, None)
+        if page is None or page.get("missing", False) or page.get("invalid", False):
+            resolved[title] = None
+        else:
+            resolved[title] = PageRevision(canonical, page["lastrevid"])
+    return resolved
+
+
+async def resolve(
+    session: aiohttp.ClientSession,
+    scheduler: Scheduler,
+    titles: list[str],
+    api_url: str = API_URL,
+) -> dict[str, PageRevision | None]:
+    """
+    Resolve any number of titles, batching them into multi-title queries.
+
+    Titles in a batch that failed after all retries are left out of the result.
+    """
+    batches = [
+        titles[i : i + QUERY_BATCH_SIZE]
+        for i in range(0, len(titles), QUERY_BATCH_SIZE)
+    ]
+    results = await asyncio.gather(
+        *[
+            scheduler.run(
+                api_url, functools.partial(resolve_batch, session, batch, api_url)
+            )
+            for batch in batches
+        ],
+        return_exceptions=True,
+    )
+    resolved: dict[str, PageRevision | None] = {}
+    for result in results:
+        if isinstance(result, dict):
+            resolved.update(result)
+    return resolved
+
+
+async def render(
+    session: aiohttp.ClientSession,
+    title: str,
+    page: PageRevision,
+    cache: ResponseCache | None,
+    api_url: str = API_URL,
+) -> str:
+    """
+    Get the unskinned HTML of a page revision. The cached copy is used without any
+    request if it was rendered from the same revision.
+    """
+    cached = cache.lookup(title) if cache is not None else None
+    if (
+        cache is not None
+        and cached is not None
+        and cached.get_revision() == page.get_revision()
+    ):
+        cache.record_hit()
+        return cached.get_body()
+
+    data = await call(
+        session,
+        api_url,
+        {
+            "action": "parse",
+            "oldid": str(page.get_revision()),
+            "prop": "text",
+            "disableeditsection": "1",
+            "disablelimitreport": "1",
+        },
+    )
+    text = data["parse"]["text"]
+    if cache is not None:
+        cache.record_miss()
+        cache.store(title, 200, text, revision=page.get_revision())
+    return text
@@ -0,0 +1,299 @@
+"""
+Persistent on-disk cache for Wiktionary responses.
+"""
+
+import os
+import sqlite3
+import time
+import unicodedata
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_NEGATIVE_TTL = 24 * 60 * 60
+# Total size of the bodies kept in the cache.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_path() -> str:
+    """
+    Get the default location of the response cache following the XDG base directory
+    specification.
+    """
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(cache_home, "language-practice", "responses.sqlite")
+
+
+def normalize_title(word: str) -> str:
+    """
+    Normalize a word into the Wiktionary page title used both for the request URL and
+    as the cache key.
+    """
+    return (
+        unicodedata.normalize("NFC", word)
+        .replace("\u0301", "")
+        .strip()
+        .replace(" ", "_")
+    )
+
+
+class CachedResponse:
+    """
+    A single response stored in the cache.
+    """
+
+    #  pylint: disable=too-many-arguments
+    #  pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        status: int,
+        body: str,
+        etag: str | None,
+        last_modified: str | None,
+        fetched_at: float,
+        revision: int | None,
+    ):
+        self.status = status
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.revision = revision
+
+    def get_status(self) -> int:
+        """
+        Get HTTP status of the cached response.
+        """
+        return self.status
+
+    def get_body(self) -> str:
+        """
+        Get body of the cached response.
+        """
+        return self.body
+
+    def get_revision(self) -> int | None:
+        """
+        Get the MediaWiki revision the cached body was rendered from, if known.
+        """
+        return self.revision
+
+    def get_conditional_headers(self) -> dict[str, str]:
+        """
+        Get headers required to revalidate this response with the server.
+        """
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+#  pylint: disable=too-many-instance-attributes
+class ResponseCache:
+    """
+    Response cache backed by sqlite keyed by normalized page title.
+
+    Fresh entries are served straight from disk. Stale entries are revalidated with
+    their ETag or Last-Modified header so unchanged pages only cost a 304. Once the
+    cache grows past its maximum size, the least recently used entries are evicted
+    until it is back to nine tenths of it.
+    """
+
+    TABLE_NAME = "responses"
+    SCHEMA = (
+        "title TEXT PRIMARY KEY NOT NULL, status INTEGER NOT NULL, body TEXT NOT NULL, "
+        "etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL, revision INTEGER, "
+        "used_at REAL NOT NULL DEFAULT 0"
+    )
+    # Size of a body in bytes.
+    BODY_SIZE = "length(CAST(body AS BLOB))"
+
+    def __init__(
+        self,
+        path: str | None = None,
+        ttl: float = DEFAULT_TTL,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        if path is None:
+            path = default_cache_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+        # The cache is created on the GTK thread but only used from the asyncio loop.
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # Losing the tail of a cache on a crash is harmless so skip the fsyncs.
+        self.conn.execute("PRAGMA synchronous = OFF;")
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {ResponseCache.TABLE_NAME} "
+            f"({ResponseCache.SCHEMA});"
+        )
+        res = self.conn.execute(f"PRAGMA table_info({ResponseCache.TABLE_NAME});")
+        columns = [column[1] for column in res.fetchall()]
+        if "revision" not in columns:
+            self.conn.execute(
+                f"ALTER TABLE {ResponseCache.TABLE_NAME} ADD COLUMN revision INTEGER;"
+            )
+        if "used_at" not in columns:
+            self.conn.execute(
+                f"ALTER TABLE {ResponseCache.TABLE_NAME} "
+                "ADD COLUMN used_at REAL NOT NULL DEFAULT 0;"
+            )
+        res = self.conn.execute(
+            f"SELECT COALESCE(SUM({ResponseCache.BODY_SIZE}), 0) FROM "
+            f"{ResponseCache.TABLE_NAME}"
+        )
+        self.size = res.fetchone()[0]
+        self.__evict()
+        self.conn.commit()
+
+    def lookup(self, title: str) -> CachedResponse | None:
+        """
+        Look up a cached response by normalized title.
+        """
+        res = self.conn.execute(
+            "SELECT status, body, etag, last_modified, fetched_at, revision FROM "
+            f"{ResponseCache.TABLE_NAME} WHERE title = ?",
+            (title,),
+        )
+        row = res.fetchone()
+        if row is None:
+            return None
+        self.conn.execute(
+            f"UPDATE {ResponseCache.TABLE_NAME} SET used_at = ? WHERE title = ?",
+            (time.time(), title),
+        )
+        self.conn.commit()
+        return CachedResponse(*row)
+
+    def is_fresh(self, cached: CachedResponse) -> bool:
+        """
+        Check whether a cached response can be used without revalidation.
+        """
+        ttl = self.ttl if cached.get_status() == 200 else self.negative_ttl
+        return time.time() - cached.fetched_at < ttl
+
+    #  pylint: disable=too-many-arguments
+    #  pylint: disable=too-many-positional-arguments
+    def store(
+        self,
+        title: str,
+        status: int,
+        body: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        revision: int | None = None,
+    ):
+        """
+        Store a response in the cache and evict the least recently used responses if
+        the cache grew past its maximum size.
+        """
+        res = self.conn.execute(
+            f"SELECT {ResponseCache.BODY_SIZE} FROM {ResponseCache.TABLE_NAME} "
+            "WHERE title = ?",
+            (title,),
+        )
+        row = res.fetchone()
+        if row is not None:
+            self.size -= row[0]
+        now = time.time()
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO {ResponseCache.TABLE_NAME} (title, status, body, "
+            "etag, last_modified, fetched_at, revision, used_at) "
+            "VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+            (title, status, body, etag, last_modified, now, revision, now),
+        )
+        self.size += len(body.encode("utf-8"))
+        self.__evict()
+        self.conn.commit()
+
+    def __evict(self):
+        """
+        Evict the least recently used responses once the cache is larger than its
+        maximum size. Enough is evicted at once that the next few stores do not have
+        to evict again.
+        """
+        if self.size <= self.max_bytes:
+            return
+        res = self.conn.execute(
+            f"SELECT title, {ResponseCache.BODY_SIZE} FROM {ResponseCache.TABLE_NAME} "
+            "ORDER BY used_at"
+        )
+        evicted = []
+        for title, length in res.fetchall():
+            if self.size <= self.max_bytes * 9 // 10:
+                break
+            evicted.append((title,))
+            self.size -= length
+        self.conn.executemany(
+            f"DELETE FROM {ResponseCache.TABLE_NAME} WHERE title = ?", evicted
+        )
+
+    def refresh(self, title: str):
+        """
+        Mark a cached response as fresh after the server confirmed it is unchanged.
+        """
+        self.conn.execute(
+            f"UPDATE {ResponseCache.TABLE_NAME} SET fetched_at = ? WHERE title = ?",
+            (time.time(), title),
+        )
+        self.conn.commit()
+
+    def record_hit(self):
+        """
+        Record a response served from disk without a request.
+        """
+        self.hits += 1
+
+    def record_revalidated(self):
+        """
+        Record a response confirmed unchanged by the server.
+        """
+        self.revalidated += 1
+
+    def record_miss(self):
+        """
+        Record a response that had to be downloaded.
+        """
+        self.misses += 1
+
+    def get_hits(self) -> int:
+        """
+        Get number of responses served from disk.
+        """
+        return self.hits
+
+    def get_revalidated(self) -> int:
+        """
+        Get number of responses revalidated with a 304.
+        """
+        return self.revalidated
+
+    def get_misses(self) -> int:
+        """
+        Get number of responses downloaded in full.
+        """
+        return self.misses
+
+    def report(self) -> str:
+        """
+        Get a human readable summary of cache effectiveness.
+        """
+        return (
+            f"{self.hits} cache hits, {self.revalidated} revalidated, "
+            f"{self.misses} downloaded"
+        )
+
+    def close(self):
+        """
+        Close connection to the cache.
+        """
+        self.conn.close()
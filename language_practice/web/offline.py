@@ -0,0 +1,169 @@
+"""
+Offline chart source built from a wiktextract dump of Wiktionary.
+"""
+
+import bz2
+import gzip
+import json
+import lzma
+import os
+import sqlite3
+from typing import IO, Any, Iterator
+
+from language_practice.web.cache import normalize_title
+
+# Forms carrying these tags describe the table rather than being an inflection.
+IGNORED_TAGS = {"table-tags", "inflection-template", "class", "romanization"}
+
+
+def default_store_path() -> str:
+    """
+    Get the default location of the offline store following the XDG base directory
+    specification.
+    """
+    data_home = os.environ.get(
+        "XDG_DATA_HOME", os.path.join(os.path.expanduser("~"), ".local", "share")
+    )
+    return os.path.join(data_home, "language-practice", "offline.sqlite")
+
+
+def open_dump(dump_path: str) -> IO[str]:
+    """
+    Open a possibly compressed JSONL dump for streaming.
+    """
+    if dump_path.endswith(".gz"):
+        return gzip.open(dump_path, "rt", encoding="utf-8")
+    if dump_path.endswith(".bz2"):
+        return bz2.open(dump_path, "rt", encoding="utf-8")
+    if dump_path.endswith(".xz"):
+        return lzma.open(dump_path, "rt", encoding="utf-8")
+    return open(dump_path, "r", encoding="utf-8")
+
+
+def entry_chart(entry: dict[str, Any]) -> list[list[str]]:
+    """
+    Build an inflection chart from the forms of a single wiktextract entry.
+    """
+    chart = []
+    seen = set()
+    for form in entry.get("forms", []):
+        tags = form.get("tags", [])
+        text = form.get("form", "").strip()
+        if not text or IGNORED_TAGS.intersection(tags):
+            continue
+        row = (" ".join(tags), text)
+        if row not in seen:
+            seen.add(row)
+            chart.append(list(row))
+    return chart
+
+
+def extract(dump: IO[str], langs: set[str]) -> Iterator[tuple[str, str, str]]:
+    """
+    Stream the charts out of a dump one entry at a time.
+    """
+    for line in dump:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        lang = entry.get("lang_code", None)
+        word = entry.get("word", None)
+        if lang not in langs or word is None:
+            continue
+        chart = entry_chart(entry)
+        if chart:
+            yield (lang, normalize_title(word), json.dumps(chart, ensure_ascii=False))
+
+
+class OfflineStore:
+    """
+    Indexed local store of inflection charts keyed by language and headword.
+    """
+
+    TABLE_NAME = "charts"
+    SCHEMA = "lang TEXT NOT NULL, word TEXT NOT NULL, chart TEXT NOT NULL"
+    STAGING_TABLE_NAME = "charts_staging"
+
+    def __init__(self, path: str | None = None, writable: bool = False):
+        if path is None:
+            path = default_store_path()
+        if writable:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.conn = sqlite3.connect(path)
+        else:
+            # The store is opened on the GTK thread but only read from the asyncio
+            # loop.
+            self.conn = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+
+    @staticmethod
+    def exists(path: str | None = None) -> bool:
+        """
+        Check whether an offline store has been built.
+        """
+        return os.path.exists(default_store_path() if path is None else path)
+
+    def ingest(self, dump_path: str, langs: set[str] | None = None) -> int:
+        """
+        Stream a wiktextract JSONL dump into the store, replacing its previous
+        contents. Returns the number of charts stored.
+        """
+        if langs is None:
+            langs = {"fr", "ru", "uk"}
+
+        table_name = OfflineStore.TABLE_NAME
+        staging = OfflineStore.STAGING_TABLE_NAME
+        # The dump is loaded next to the current charts so that a failed ingest
+        # leaves the previous store intact.
+        self.conn.execute(f"DROP TABLE IF EXISTS {staging};")
+        self.conn.execute(f"CREATE TABLE {staging} ({OfflineStore.SCHEMA});")
+        try:
+            with open_dump(dump_path) as dump:
+                self.conn.executemany(
+                    f"INSERT INTO {staging} (lang, word, chart) VALUES(?, ?, ?)",
+                    extract(dump, langs),
+                )
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            self.conn.execute(f"DROP TABLE IF EXISTS {staging};")
+            raise
+
+        # Swap the new charts in within a single transaction. Building the index
+        # once after loading is much faster than maintaining it.
+        with self.conn:
+            self.conn.execute("BEGIN;")
+            self.conn.execute(f"DROP TABLE IF EXISTS {table_name};")
+            self.conn.execute(f"ALTER TABLE {staging} RENAME TO {table_name};")
+            self.conn.execute(
+                f"CREATE INDEX {table_name}_lang_word ON {table_name} (lang, word);"
+            )
+
+        res = self.conn.execute(f"SELECT COUNT(*) FROM {table_name};")
+        return res.fetchone()[0]
+
+    def lookup(self, lang: str, word: str) -> list[list[list[str]]] | None:
+        """
+        Look up the charts for a word. Returns None if the word is not in the store
+        or the store cannot be read so the charts are downloaded instead.
+        """
+        try:
+            res = self.conn.execute(
+                f"SELECT chart FROM {OfflineStore.TABLE_NAME} WHERE lang = ? AND "
+                "word = ? ORDER BY rowid",
+                (lang, normalize_title(word)),
+            )
+            charts = [json.loads(chart) for (chart,) in res.fetchall()]
+        except (sqlite3.Error, ValueError):
+            return None
+        if not charts:
+            return None
+        return charts
+
+    def close(self):
+        """
+        Close connection to the store.
+        """
+        self.conn.close()
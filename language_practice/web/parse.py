@@ -0,0 +1,81 @@
+"""
+Parsing of downloaded pages into inflection charts.
+
+Parsing is CPU bound so this module is kept free of any asyncio or GTK state to allow
+it to run in worker processes.
+"""
+
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from language_practice.web import fr, ru, uk
+
+try:
+    import lxml  # type: ignore  # pylint: disable=unused-import
+
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+LANGUAGE_HEADINGS = {"fr": "French", "ru": "Russian", "uk": "Ukrainian"}
+
+# Only the tags the language parsers look at are built into the tree.
+PARSED_TAGS = {"fr": ["table", "b", "span"], "ru": ["table", "b"], "uk": ["table"]}
+
+NEXT_HEADING = re.compile(r"<h2\b")
+
+
+def language_section(text: str, lang: str) -> str:
+    """
+    Cut a page down to the section for a language, starting at its level two heading
+    and ending at the heading of the next language. The whole page is returned if the
+    heading cannot be found.
+    """
+    heading = LANGUAGE_HEADINGS[lang]
+    start = re.search(
+        rf'<h2\b[^>]*\bid="{heading}"|<h2\b[^>]*>\s*<span\b[^>]*\bid="{heading}"',
+        text,
+    )
+    if start is None:
+        return text
+    end = NEXT_HEADING.search(text, start.end())
+    if end is None:
+        return text[start.start() :]
+    return text[start.start() : end.start()]
+
+
+def parse_page(text: str, lang: str) -> list[list[list[str]]]:
+    """
+    Parse the raw HTML of a page into the inflection charts for a language.
+    """
+    if lang not in LANGUAGE_HEADINGS:
+        raise RuntimeError(
+            "Reached a condition that should be unreachable; please file a bug"
+        )
+
+    html = BeautifulSoup(
+        language_section(text, lang),
+        PARSER,
+        parse_only=SoupStrainer(PARSED_TAGS[lang]),
+    )
+
+    if lang == "fr":
+        return fr.parse(html)
+    if lang == "ru":
+        return ru.parse(html)
+    return uk.parse(html)
+
+
+def parse_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    Create a process pool for parsing pages.
+
+    Workers are spawned rather than forked as forking a process with GTK and asyncio
+    threads running is not safe.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    )
@@ -0,0 +1,139 @@
+"""
+Scheduling of web requests with bounded concurrency, rate limiting and retries.
+"""
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+from urllib.parse import urlparse
+
+import aiohttp
+
+T = TypeVar("T")
+
+
+class RetryableError(Exception):
+    """
+    Raised for responses that indicate the request should be tried again later.
+    """
+
+    def __init__(self, status: int, retry_after: float | None = None):
+        super().__init__(f"Server responded with status {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+    def get_retry_after(self) -> float | None:
+        """
+        Get the delay requested by the server through the Retry-After header.
+        """
+        return self.retry_after
+
+
+def check_retryable(response: aiohttp.ClientResponse):
+    """
+    Raise a RetryableError if the server is throttling us or failed temporarily.
+    """
+    if response.status == 429 or response.status >= 500:
+        retry_after = None
+        try:
+            retry_after = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            pass
+        raise RetryableError(response.status, retry_after)
+
+
+#  pylint: disable=too-few-public-methods
+class RateLimiter:
+    """
+    Token bucket rate limiter for a single host.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        """
+        Wait until a token is available and consume it.
+        """
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Scheduler:
+    """
+    Runs requests with a cap on concurrency, a token bucket per host and retries with
+    jittered exponential backoff for throttling, server errors and timeouts.
+    """
+
+    #  pylint: disable=too-many-arguments
+    #  pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        concurrency: int = 10,
+        rate: float = 10.0,
+        burst: int = 10,
+        retries: int = 4,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limiters: dict[str, RateLimiter] = {}
+
+    def get_limiter(self, url: str) -> RateLimiter:
+        """
+        Get the rate limiter for the host of a URL.
+        """
+        host = urlparse(url).netloc
+        limiter = self.limiters.get(host, None)
+        if limiter is None:
+            limiter = RateLimiter(self.rate, self.burst)
+            self.limiters[host] = limiter
+        return limiter
+
+    def delay(self, attempt: int, retry_after: float | None) -> float:
+        """
+        Get the time to wait before the next attempt.
+        """
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, min(self.max_backoff, retry_after))
+        return delay
+
+    async def run(self, url: str, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run a request against a URL, retrying it if it fails temporarily.
+        """
+        limiter = self.get_limiter(url)
+        async with self.semaphore:
+            attempt = 0
+            while True:
+                await limiter.acquire()
+                try:
+                    return await request()
+                except RetryableError as err:
+                    if attempt >= self.retries:
+                        raise
+                    retry_after = err.get_retry_after()
+                except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+                    if attempt >= self.retries:
+                        raise
+                    retry_after = None
+                await asyncio.sleep(self.delay(attempt, retry_after))
+                attempt += 1
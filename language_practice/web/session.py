@@ -0,0 +1,50 @@
+"""
+Application wide HTTP session management.
+"""
+
+import aiohttp
+
+
+class SessionManager:
+    """
+    Owns a single long-lived HTTP session on the asyncio loop so all imports share
+    warm keep-alive connections and cached DNS lookups.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 60.0,
+        timeout: float = 60.0,
+    ):
+        self.pool_size = pool_size
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.session: aiohttp.ClientSession | None = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the shared session, creating it on first use. Must be called from the
+        asyncio loop the session will be used on.
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self.session
+
+    async def close(self):
+        """
+        Close the shared session and all of its pooled connections.
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
@@ -0,0 +1,164 @@
+"""
+Database access from a dedicated worker thread.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from language_practice.config import Config
+from language_practice.repetition import WordRepetition
+from language_practice.sqlite import SearchResult, SetSummary, SqliteHandle
+
+T = TypeVar("T")
+
+
+class DatabaseWorker:
+    """
+    Owns a database connection on a thread of its own so that long running
+    operations never block the GTK main loop or the asyncio loop.
+
+    Every operation returns a concurrent.futures.Future. GTK callbacks can attach a
+    done callback that hands the result back to the main loop with GLib.idle_add and
+    coroutines can await asyncio.wrap_future(). Operations run in the order they were
+    submitted.
+    """
+
+    def __init__(self, db: str, wal: bool = False):
+        self.db = db
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+        self.handle: SqliteHandle | None = None
+        self.opened = self.executor.submit(self.__open, db, wal)
+
+    def __open(self, db: str, wal: bool):
+        """
+        Open the connection on the worker thread.
+        """
+        self.handle = SqliteHandle(db, wal=wal)
+
+    def __get_handle(self) -> SqliteHandle:
+        """
+        Get the handle on the worker thread, raising the error from opening the
+        database if it could not be opened.
+        """
+        self.opened.result()
+        assert self.handle is not None
+        return self.handle
+
+    def get_path(self) -> str:
+        """
+        Get path of the database file.
+        """
+        return self.db
+
+    def run(self, func: Callable[..., T], *args: Any) -> Future[T]:
+        """
+        Run a function that uses the database on the worker thread.
+        """
+        return self.executor.submit(func, *args)
+
+    def import_set(
+        self, file_name: str, config: Config, scraped: dict[str, list[list[list[str]]]]
+    ) -> Future[bool]:
+        """
+        Import set into database.
+        """
+        return self.run(
+            lambda: self.__get_handle().import_set(file_name, config, scraped)
+        )
+
+    def store_charts(
+        self, file_name: str, scraped: dict[str, list[list[list[str]]]]
+    ) -> Future[int]:
+        """
+        Store scraped charts for words of a set that have already been imported.
+        """
+        return self.run(lambda: self.__get_handle().store_charts(file_name, scraped))
+
+    def get_charted_words(self, file_name: str) -> Future[set[str]]:
+        """
+        Get all words in a flashcard set that already have charts stored or that were
+        scraped without finding any charts.
+        """
+        return self.run(lambda: self.__get_handle().get_charted_words(file_name))
+
+    def delete_set(self, file_name: str) -> Future[None]:
+        """
+        Delete a set from the database if it exists.
+        """
+
+        def delete():
+            handle = self.__get_handle()
+            set_id = handle.get_id_from_file_name(file_name)
+            if set_id is not None:
+                handle.delete_set(set_id)
+
+        return self.run(delete)
+
+    def load_config(self, file_names: list[str]) -> Future[Config | None]:
+        """
+        Load the words that are due for study from one or more sets.
+        """
+
+        def load() -> Config | None:
+            handle = self.__get_handle()
+            config = None
+            for file_name in file_names:
+                if config is None:
+                    config = handle.load_config(file_name)
+                else:
+                    config = config.extend(handle.load_config(file_name))
+            return config
+
+        return self.run(load)
+
+    def update_config(self, word: str, repetition: WordRepetition) -> Future[None]:
+        """
+        Update config for word.
+        """
+        return self.run(lambda: self.__get_handle().update_config(word, repetition))
+
+    def flush_grades(self, wait: bool = True) -> Future[None]:
+        """
+        Write all grades that are still pending to disk.
+        """
+        return self.run(lambda: self.__get_handle().flush_grades(wait))
+
+    def pause_grades(self, paused: bool) -> Future[None]:
+        """
+        Hold grades in memory instead of writing them in the background.
+        """
+        return self.run(lambda: self.__get_handle().pause_grades(paused))
+
+    def get_all_sets(self) -> Future[list[str]]:
+        """
+        Get all flashcard sets from database.
+        """
+        return self.run(lambda: self.__get_handle().get_all_sets())
+
+    def get_set_summaries(self) -> Future[list[SetSummary]]:
+        """
+        Get the number of due, review, new and total words of all flashcard sets.
+        """
+        return self.run(lambda: self.__get_handle().get_set_summaries())
+
+    def search(self, text: str) -> Future[list[SearchResult]]:
+        """
+        Find words matching a search.
+        """
+        return self.run(lambda: self.__get_handle().search(text))
+
+    def close(self) -> Future[None]:
+        """
+        Close connection to database once all submitted operations have finished
+        without waiting for them. No operations may be submitted afterwards.
+        """
+
+        def close():
+            if self.handle is not None:
+                self.handle.close()
+
+        closed = self.executor.submit(close)
+        # The worker thread is still joined when the interpreter exits so the
+        # connection is closed and pending grades are written even then.
+        self.executor.shutdown(wait=False)
+        return closed